@@ -0,0 +1,176 @@
+"""
+Anytime search: restarting weighted A* that converges to an optimal plan.
+
+The search runs weighted A* (priority g + w * h) with a decreasing
+series of weights, starting with greedy best-first search (w = inf,
+priority h). Each run stops at its first plan cheaper than the best one
+so far, which is handed to a callback right away, and prunes every node
+with g + h >= that cost, so later runs only look for cheaper plans. The
+plan found by the final w = 1 run is optimal, and so is the best plan
+as soon as a run ends without finding a cheaper one: with an admissible
+heuristic, pruning by g + h cannot remove a cheaper plan.
+
+Runs with w > 1 test for the goal when a state is generated, which
+finds the first plans sooner; the w = 1 run tests when a state is
+expanded, as A* must for optimality.
+"""
+
+import math
+import time
+import heapq
+from search_statistics import SearchStatistics
+from successor_generator import SuccessorGenerator
+from planner import SearchSpace, check_goal
+
+DEFAULT_WEIGHTS = (math.inf, 5, 3, 2, 1.5, 1)
+
+class AnytimeSearch:
+    """
+    Restarting weighted A* over a series of weights ending in 1.
+
+    Attributes:
+        plans: (cost, weight, seconds) of every improved plan, in order
+        optimal: True once the best plan (or the absence of one) is proven
+            optimal
+    """
+
+    def __init__(self, task, heuristic_fn, successor_generator=None,
+                 weights=DEFAULT_WEIGHTS, time_limit=None, on_plan=None, statistics=None):
+        if not weights or weights[-1] != 1:
+            raise ValueError("the last weight must be 1")
+        self.task = task
+        self.heuristic_fn = heuristic_fn
+        self.successor_generator = successor_generator or SuccessorGenerator(task)
+        self.weights = weights
+        self.time_limit = time_limit
+        self.on_plan = on_plan
+        self.statistics = statistics if statistics is not None else SearchStatistics()
+        self.plans = []
+        self.optimal = False
+        self.timed_out = False
+
+    def run(self):
+        """
+        Search until the best plan is proven optimal or time runs out.
+
+        Returns:
+            (plan, cost) tuple of the best plan found, (None, math.inf) if
+            there is none
+        """
+        self.start = time.perf_counter()
+        self.deadline = None if self.time_limit is None else self.start + self.time_limit
+        best_plan, best_cost = None, math.inf
+        for weight in self.weights:
+            try:
+                plan, cost = self._weighted_astar(weight, best_cost)
+            except TimeoutError:
+                self.timed_out = True
+                break
+            if plan is None:
+                # Nothing is cheaper than the incumbent
+                self.optimal = True
+                break
+            best_plan, best_cost = plan, cost
+            self.plans.append((cost, weight, time.perf_counter() - self.start))
+            if self.on_plan is not None:
+                self.on_plan(plan, cost)
+            if weight == 1:
+                self.optimal = True
+                break
+        return best_plan, best_cost
+
+    def _weighted_astar(self, weight, bound):
+        """
+        One run of weighted A* that only looks for plans cheaper than
+        `bound`; w = inf is greedy best-first search.
+
+        Returns:
+            (plan, cost) of the first such plan, (None, math.inf) if there is none
+        """
+        task = self.task
+        heuristic_fn = self.heuristic_fn
+        get_applicable = self.successor_generator.get_applicable
+        statistics = self.statistics
+        goal_mask = task.goal_mask
+        deadline = self.deadline
+        goal_on_generation = weight > 1
+
+        def priority(g, h):
+            return h if weight == math.inf else g + weight * h
+
+        def solution(node, g):
+            plan = space.extract_plan(node)
+            return [task.operators[op_id].name for op_id in plan], g
+
+        initial_state = task.initial_state()
+        statistics.evaluated += 1
+        initial_h = heuristic_fn(initial_state)
+        if initial_h >= bound:
+            if initial_h == math.inf:
+                statistics.dead_ends += 1
+            return None, math.inf
+
+        space = SearchSpace()
+        node_of = space.node_of
+        g_values = space.g
+        root = space.add(initial_state, -1, -1, 0)
+        if goal_on_generation and check_goal(initial_state, goal_mask):
+            return solution(root, 0)
+
+        # Entries are (priority, h, -node, g); ties are broken by lower h and
+        # then by the newest node, which follows plateaus depth-first
+        open_list = [(priority(0, initial_h), initial_h, -root, 0)]
+        while open_list:
+            _, h, node, g = heapq.heappop(open_list)
+            node = -node
+            if g > g_values[node] or g + h >= bound:
+                continue  # Stale entry, or it cannot lead to a cheaper plan
+            current_state = space.states[node]
+            if not goal_on_generation and check_goal(current_state, goal_mask):
+                return solution(node, g)
+
+            statistics.expanded += 1
+            if deadline is not None and not statistics.expanded % 64:
+                if time.perf_counter() > deadline:
+                    raise TimeoutError()
+
+            applicable_ops = get_applicable(current_state)
+            statistics.generated += len(applicable_ops)
+            for op in applicable_ops:
+                next_state = (current_state & op.keep_mask) | op.add_mask
+                new_g = g + op.cost
+                if new_g >= bound:
+                    continue
+                next_node = node_of.get(next_state)
+                if next_node is None:
+                    next_node = space.add(next_state, node, op.index, new_g)
+                elif new_g < g_values[next_node]:
+                    space.update(next_node, node, op.index, new_g)
+                else:
+                    continue
+
+                statistics.evaluated += 1
+                next_h = heuristic_fn(next_state)
+                if next_h == math.inf:
+                    statistics.dead_ends += 1
+                    continue
+                if new_g + next_h >= bound:
+                    continue
+                if goal_on_generation and check_goal(next_state, goal_mask):
+                    return solution(next_node, new_g)
+                heapq.heappush(open_list, (priority(new_g, next_h), next_h, -next_node, new_g))
+
+        return None, math.inf
+
+    def report(self):
+        lines = [f"Anytime plan {i + 1}: cost {cost} with weight {weight} after {seconds:.3f}s"
+                 for i, (cost, weight, seconds) in enumerate(self.plans)]
+        if self.optimal:
+            if self.plans:
+                lines.append("Anytime search: best plan proven optimal")
+            else:
+                lines.append("Anytime search: proven that no plan exists")
+        elif self.timed_out:
+            lines.append(f"Anytime search: time limit of {self.time_limit}s reached, "
+                         f"best plan not proven optimal")
+        return '\n'.join(lines)
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Batch planning service: solve many tasks in one pool of warm workers.
+
+The manifest is either a directory (every .sas file in it is solved
+with the command-line defaults) or a JSONL file with one task per line:
+
+    {"task": "data/elevators01.sas", "heuristic": "lmcut",
+     "search": "astar", "pruning": "stubborn", "time_limit": 60,
+     "memory_limit": 2048}
+
+Only "task" is required; relative paths are resolved against the
+directory of the manifest, and missing keys take the command-line
+defaults. Worker processes import the planner once and then solve tasks
+one after another, so only the first task of a worker pays for
+interpreter startup and imports.
+
+Every task runs under its own limits: the time limit is enforced with a
+timer signal, the memory limit (in MiB) by lowering the worker's soft
+address-space limit while the task runs. A result line is written as
+soon as each task finishes, in completion order:
+
+    {"task": ..., "status": "solved", "cost": 42, "plan": [...],
+     "time": 1.23, "expanded": ..., ...}
+
+status is one of solved, unsolvable, timeout, memout or error.
+"""
+
+import os
+import sys
+import json
+import errno
+import time
+import signal
+import argparse
+import resource
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from task_cache import load_task_cached
+from simplify import simplify_task
+from search_statistics import SearchStatistics
+from successor_generator import SuccessorGenerator
+from stubborn_sets import StubbornSetSuccessorGenerator
+from planner import astar, make_heuristic, HeuristicCache
+
+DEFAULTS = {
+    'heuristic': 'lmcut',
+    'search': 'astar',
+    'pruning': 'none',
+    'time_limit': None,    # seconds
+    'memory_limit': None,  # MiB
+}
+
+# Values accepted for the keys of a manifest line and for their command-line options
+CHOICES = {
+    'heuristic': ('hmax', 'lmcut'),
+    'search': ('astar', 'idastar'),
+    'pruning': ('none', 'stubborn'),
+}
+
+class TimeLimitExceeded(Exception):
+    pass
+
+def _on_alarm(signum, frame):
+    raise TimeLimitExceeded()
+
+def read_manifest(path, defaults):
+    """Return the task specs of a manifest directory or JSONL file."""
+    if os.path.isdir(path):
+        return [dict(defaults, task=os.path.join(path, name))
+                for name in sorted(os.listdir(path)) if name.endswith('.sas')]
+    base = os.path.dirname(path)
+    specs = []
+    with open(path) as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                spec = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"{path}:{line_no}: {e}") from None
+            if 'task' not in spec:
+                raise ValueError(f"{path}:{line_no}: missing 'task'")
+            unknown = set(spec) - set(DEFAULTS) - {'task'}
+            if unknown:
+                raise ValueError(f"{path}:{line_no}: unknown key(s) {sorted(unknown)}")
+            for key, choices in CHOICES.items():
+                if key in spec and spec[key] not in choices:
+                    raise ValueError(f"{path}:{line_no}: invalid {key} {spec[key]!r} "
+                                     f"(choose from {', '.join(choices)})")
+            spec = dict(defaults, **spec)
+            spec['task'] = os.path.join(base, spec['task'])
+            specs.append(spec)
+    return specs
+
+def _search(spec):
+    task, _ = simplify_task(load_task_cached(spec['task']))
+    heuristic = HeuristicCache(make_heuristic(spec['heuristic'], task), 1000000)
+    successor_generator = SuccessorGenerator(task)
+    if spec['pruning'] == 'stubborn':
+        successor_generator = StubbornSetSuccessorGenerator(task, successor_generator)
+    statistics = SearchStatistics()
+    if spec['search'] == 'idastar':
+        from idastar import idastar
+        plan, cost = idastar(task, heuristic, successor_generator, statistics=statistics)
+    else:
+        plan, cost = astar(task, heuristic, successor_generator, statistics=statistics)
+    return plan, cost, statistics
+
+def solve(spec):
+    """Solve one task spec in a worker and return its result record."""
+    result = {'task': spec['task'], 'heuristic': spec['heuristic'], 'search': spec['search']}
+    start = time.perf_counter()
+    old_limit = resource.getrlimit(resource.RLIMIT_AS)
+    try:
+        if spec['memory_limit']:
+            limit = spec['memory_limit'] * 1024 * 1024
+            if old_limit[1] != resource.RLIM_INFINITY:
+                limit = min(limit, old_limit[1])
+            resource.setrlimit(resource.RLIMIT_AS, (limit, old_limit[1]))
+        if spec['time_limit']:
+            signal.signal(signal.SIGALRM, _on_alarm)
+            signal.setitimer(signal.ITIMER_REAL, spec['time_limit'])
+        try:
+            plan, cost, statistics = _search(spec)
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+        if plan is None:
+            result['status'] = 'unsolvable'
+        else:
+            result.update(status='solved', cost=cost, plan=plan)
+        result.update(statistics.as_dict())
+    except TimeLimitExceeded:
+        result['status'] = 'timeout'
+    except MemoryError:
+        result['status'] = 'memout'
+    except Exception as e:
+        # mmap and friends report an exhausted address space as ENOMEM
+        if isinstance(e, OSError) and e.errno == errno.ENOMEM:
+            result['status'] = 'memout'
+        else:
+            result.update(status='error', error=f"{type(e).__name__}: {e}")
+    finally:
+        resource.setrlimit(resource.RLIMIT_AS, old_limit)
+    result['time'] = time.perf_counter() - start
+    return result
+
+def run_batch(specs, workers, out):
+    """
+    Solve all specs in a pool of `workers` processes, writing one JSON line
+    per task to `out` as soon as it finishes.
+
+    Returns:
+        Dict mapping status -> number of tasks
+    """
+    counts = {}
+    with ProcessPoolExecutor(workers) as executor:
+        futures = {executor.submit(solve, spec): spec for spec in specs}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                # The worker died (e.g. it was killed by the OS)
+                result = {'task': futures[future]['task'], 'status': 'error',
+                          'error': f"{type(e).__name__}: {e}"}
+            counts[result['status']] = counts.get(result['status'], 0) + 1
+            out.write(json.dumps(result) + '\n')
+            out.flush()
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description='Solve a batch of SAS tasks in a worker pool')
+    parser.add_argument('manifest', help='Directory of .sas files or JSONL manifest')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help='Number of worker processes (default: number of CPUs)')
+    parser.add_argument('--heuristic', choices=CHOICES['heuristic'], default=DEFAULTS['heuristic'],
+                        help=f"Default heuristic (default: {DEFAULTS['heuristic']})")
+    parser.add_argument('--search', choices=CHOICES['search'], default=DEFAULTS['search'],
+                        help=f"Default search algorithm (default: {DEFAULTS['search']})")
+    parser.add_argument('--pruning', choices=CHOICES['pruning'], default=DEFAULTS['pruning'],
+                        help=f"Default pruning (default: {DEFAULTS['pruning']})")
+    parser.add_argument('--time-limit', type=float, default=None,
+                        help='Default time limit per task in seconds')
+    parser.add_argument('--memory-limit', type=int, default=None,
+                        help='Default address-space limit per task in MiB')
+    parser.add_argument('--output', help='Write the results to this file (default: stdout)')
+    args = parser.parse_args()
+
+    defaults = {
+        'heuristic': args.heuristic,
+        'search': args.search,
+        'pruning': args.pruning,
+        'time_limit': args.time_limit,
+        'memory_limit': args.memory_limit,
+    }
+    try:
+        specs = read_manifest(args.manifest, defaults)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    start = time.perf_counter()
+    out = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        counts = run_batch(specs, args.workers, out)
+    finally:
+        if args.output:
+            out.close()
+    summary = ', '.join(f"{n} {status}" for status, n in sorted(counts.items()))
+    print(f"{len(specs)} task(s) in {time.perf_counter() - start:.2f}s: {summary}",
+          file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
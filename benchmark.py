@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+In-process benchmark suite for the heuristics and the planner.
+
+For every .sas file in the data directory this runs, in-process:
+
+    hmax         compute_hmax on the initial state
+    lmcut        LM-Cut on the initial state
+    astar_hmax   A* with h^max
+    astar_lmcut  A* with LM-Cut
+    astar_lmcut_parallel
+                 A* with LM-Cut evaluated by a pool of PARALLEL_WORKERS
+                 processes (planner.py --workers), including pool startup;
+                 its time against astar_lmcut is the end-to-end speedup
+
+Each benchmark is timed over several repetitions (min and median wall
+time are recorded), then run once more under tracemalloc to record its
+peak memory. Searches also record plan cost and the number of expanded,
+generated and evaluated states.
+
+Results are written as JSON and compared against two files:
+
+    benchmark_reference.json   the machine-independent values (h values,
+                               plan costs and expansions); committed, and
+                               rewritten with --update-reference
+    benchmark_baseline.json    timings and peak memory of this machine;
+                               kept out of git, and recorded locally with
+                               --update-baseline
+
+Different h values or plan costs are errors, more expansions and slower
+or more memory-hungry runs beyond the tolerance are regressions. The exit
+code is 1 if anything was flagged.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import tracemalloc
+from sas_parser import load_task
+from hmax import compute_hmax
+from lmcut import LandmarkCut
+from planner import astar, make_heuristic
+from search_statistics import SearchStatistics
+
+DATA_DIR = "data"
+REFERENCE = "benchmark_reference.json"
+BASELINE = "benchmark_baseline.json"
+REFERENCE_KEYS = ('h', 'cost', 'expanded')
+TIMING_KEYS = ('time_min', 'time_median', 'peak_memory')
+
+def _heuristic_benchmark(name):
+    def run(task):
+        state = task.init
+        if name == "hmax":
+            h = compute_hmax(task, state)
+        else:
+            h = LandmarkCut(task)(state)
+        return {'h': h}
+    return run
+
+def _search_benchmark(heuristic_name):
+    def run(task):
+        stats = SearchStatistics()
+        plan, cost = astar(task, make_heuristic(heuristic_name, task), statistics=stats)
+        result = {'cost': cost, 'plan_length': None if plan is None else len(plan)}
+        result.update(stats.as_dict())
+        return result
+    return run
+
+PARALLEL_WORKERS = 2
+
+def _parallel_search_benchmark(heuristic_name, workers):
+    def run(task):
+        from parallel_eval import ParallelEvaluator
+        stats = SearchStatistics()
+        with ParallelEvaluator(task, heuristic_name, workers) as pool:
+            plan, cost = astar(task, make_heuristic(heuristic_name, task),
+                               batch_heuristic_fn=pool, statistics=stats)
+        result = {'cost': cost, 'plan_length': None if plan is None else len(plan)}
+        result.update(stats.as_dict())
+        return result
+    return run
+
+BENCHMARKS = {
+    'hmax': _heuristic_benchmark('hmax'),
+    'lmcut': _heuristic_benchmark('lmcut'),
+    'astar_hmax': _search_benchmark('hmax'),
+    'astar_lmcut': _search_benchmark('lmcut'),
+    'astar_lmcut_parallel': _parallel_search_benchmark('lmcut', PARALLEL_WORKERS),
+}
+
+def _json_value(value):
+    # JSON has no infinity; dead ends are stored as null
+    return None if value == float('inf') else value
+
+def run_benchmark(fn, task, repeat):
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(task)
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        fn(task)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    result = {key: _json_value(value) for key, value in result.items()}
+    result['time_min'] = min(times)
+    result['time_median'] = statistics.median(times)
+    result['peak_memory'] = peak
+    return result
+
+def run_suite(sas_files, benchmarks, repeat):
+    results = {}
+    for path in sas_files:
+        name = os.path.splitext(os.path.basename(path))[0]
+        start = time.perf_counter()
+        task = load_task(path)
+        task_results = {'load_time': time.perf_counter() - start}
+        for bench in benchmarks:
+            print(f"{name} {bench} ...", end=' ', flush=True)
+            task_results[bench] = run_benchmark(BENCHMARKS[bench], task, repeat)
+            print(_summary(task_results[bench]), flush=True)
+        results[name] = task_results
+    return results
+
+def _summary(result):
+    parts = [f"{result['time_median']:.3f}s", f"{result['peak_memory'] / 1024:.0f} KiB"]
+    for key in ('h', 'cost', 'expanded'):
+        if key in result:
+            parts.append(f"{key}={result[key]}")
+    return ', '.join(parts)
+
+def select(results, keys):
+    """Return a copy of suite results with only the given keys of every benchmark."""
+    return {task_name: {bench: {key: result[key] for key in keys if key in result}
+                        for bench, result in task_results.items() if isinstance(result, dict)}
+            for task_name, task_results in results.items()}
+
+def compare(results, baseline, time_tolerance, memory_tolerance, min_time_delta=0.005):
+    """
+    Compare results against a baseline.
+
+    Only the keys present in the baseline are checked, so the same
+    function compares against the reference and the timing baseline.
+    Slowdowns of less than `min_time_delta` seconds are not flagged, so
+    sub-millisecond benchmarks do not trip on timer noise.
+
+    Returns:
+        List of human-readable problems (empty if there are none)
+    """
+    problems = []
+    for task_name, task_results in results.items():
+        base_task = baseline.get(task_name)
+        if base_task is None:
+            continue
+        for bench, result in task_results.items():
+            base = base_task.get(bench)
+            if not isinstance(result, dict) or base is None:
+                continue
+            where = f"{task_name}/{bench}"
+            for key in ('h', 'cost'):
+                if key in base and result.get(key) != base[key]:
+                    problems.append(f"ERROR {where}: {key} is {result.get(key)}, "
+                                    f"expected {base[key]}")
+            if 'expanded' in base and result['expanded'] > base['expanded']:
+                problems.append(f"REGRESSION {where}: expanded {result['expanded']} "
+                                f"> {base['expanded']}")
+            if 'time_min' in base and (
+                    result['time_min'] > base['time_min'] * (1 + time_tolerance)
+                    and result['time_min'] - base['time_min'] > min_time_delta):
+                problems.append(f"REGRESSION {where}: time {result['time_min']:.4f}s "
+                                f"> {base['time_min']:.4f}s (+{time_tolerance:.0%})")
+            if ('peak_memory' in base
+                    and result['peak_memory'] > base['peak_memory'] * (1 + memory_tolerance)):
+                problems.append(f"REGRESSION {where}: peak memory {result['peak_memory']} "
+                                f"> {base['peak_memory']} (+{memory_tolerance:.0%})")
+    return problems
+
+def _write(path, report):
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(f"Written to {path}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the heuristics and the planner')
+    parser.add_argument('tasks', nargs='*', help=f'.sas files (default: {DATA_DIR}/*.sas)')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per benchmark (default: 3)')
+    parser.add_argument('--bench', action='append', choices=sorted(BENCHMARKS),
+                        help='Benchmark to run (repeatable, default: all)')
+    parser.add_argument('--output', default='benchmark_results.json',
+                        help='Where to write the results (default: benchmark_results.json)')
+    parser.add_argument('--reference', default=REFERENCE,
+                        help=f'Machine-independent reference to compare against (default: {REFERENCE})')
+    parser.add_argument('--baseline', default=BASELINE,
+                        help=f'Local timing baseline to compare against (default: {BASELINE})')
+    parser.add_argument('--update-reference', action='store_true',
+                        help='Write h values, costs and expansions to the reference instead of comparing')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='Write timings and peak memory to the baseline instead of comparing')
+    parser.add_argument('--time-tolerance', type=float, default=0.25,
+                        help='Allowed relative slowdown before flagging (default: 0.25)')
+    parser.add_argument('--min-time-delta', type=float, default=0.005,
+                        help='Ignore slowdowns smaller than this many seconds (default: 0.005)')
+    parser.add_argument('--memory-tolerance', type=float, default=0.10,
+                        help='Allowed relative peak memory increase before flagging (default: 0.10)')
+    args = parser.parse_args()
+
+    sas_files = args.tasks or sorted(
+        os.path.join(DATA_DIR, f) for f in os.listdir(DATA_DIR) if f.endswith('.sas'))
+    benchmarks = args.bench or list(BENCHMARKS)
+
+    results = run_suite(sas_files, benchmarks, args.repeat)
+    report = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'repeat': args.repeat,
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(f"Results written to {args.output}")
+
+    if args.update_reference:
+        _write(args.reference, {'results': select(results, REFERENCE_KEYS)})
+    if args.update_baseline:
+        _write(args.baseline, dict(report, results=select(results, TIMING_KEYS)))
+    if args.update_reference or args.update_baseline:
+        return
+
+    problems = []
+    for path in (args.reference, args.baseline):
+        if not os.path.exists(path):
+            print(f"No baseline at {path}; run with --update-baseline to record one.")
+            continue
+        with open(path) as f:
+            baseline = json.load(f)['results']
+        problems.extend(compare(results, baseline, args.time_tolerance, args.memory_tolerance,
+                                args.min_time_delta))
+    for problem in problems:
+        print(problem)
+    if problems:
+        sys.exit(1)
+    print("No regressions against the baseline.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""
+Search on the finite-domain (FDR) variables of a SAS task.
+
+The STRIPS compilation turns every value of a SAS variable into an atom of
+its own. FDRTask keeps the variables instead: a state is a fixed-length
+byte string with one value per variable (a tuple if a domain has more than
+256 values), and an operator is a tuple of (var, val) conditions plus a
+tuple of (var, val) assignments. Applying an operator copies the state
+and writes one byte per effect.
+
+The mutex groups of the SAS file are invariants: at most one fact of a
+group holds in any reachable state. They are used twice. Operators whose
+conditions, or whose conditions together with their effects, contain two
+facts of one group can never be applied in a reachable state and are
+dropped when the task is built. And a successor in which a newly set
+fact and a fact of another variable share a group is invalid and is
+pruned before it is added to the search space.
+
+Heuristics still work on the compiled STRIPS task: every state is packed
+into the bitmask of the atoms of its values (see FDRTask.strips_packer).
+The search itself is planner.astar with FDRTask.apply and FDRTask.is_goal
+as its apply and goal hooks.
+"""
+
+import sys
+import time
+from operator import attrgetter
+from sas_parser import stream_sas
+
+class FDROperator:
+    """
+    An FDR operator.
+
+    Attributes:
+        conditions: (var, val) pairs that must hold, sorted by variable;
+            the prevail conditions and the old values of the effects
+        effects: (var, val) assignments, sorted by variable
+        mutex_checks: (var, val) facts on variables the operator neither
+            tests nor assigns that are mutex with one of its effects; the
+            successor is invalid if the state has one of them
+    """
+    __slots__ = ('index', 'name', 'conditions', 'effects', 'cost', 'mutex_checks')
+
+    def __init__(self, index, name, conditions, effects, cost):
+        self.index = index
+        self.name = name
+        self.conditions = conditions
+        self.effects = effects
+        self.cost = cost
+        self.mutex_checks = ()
+
+    def __repr__(self):
+        return f"FDROperator({self.index}, {self.name!r})"
+
+class FDRTask:
+    """
+    A SAS task on its multi-valued variables.
+
+    Attributes:
+        variables: Variable names
+        var_domains: Value names of every variable
+        init: Initial state (bytes, or a tuple for domains over 256 values)
+        goal: (var, val) goal conditions
+        operators: FDROperator records, indexed by their IDs; operators
+            dropped by the mutex analysis are left out
+        mutex_groups: Tuples of (var, val) facts of every mutex group
+        num_pruned_ops: Number of operators dropped by the mutex analysis
+    """
+
+    def __init__(self, variables, var_domains, initial_state, goal_state, operators,
+                 mutex_groups=()):
+        self.variables = variables
+        self.var_domains = var_domains
+        small = all(len(domain) <= 256 for domain in var_domains)
+        self._freeze = bytes if small else tuple
+        self._thaw = bytearray if small else list
+        self.init = self._freeze(initial_state)
+        self.goal = tuple(sorted(goal_state))
+        self.mutex_groups = [tuple(group) for group in mutex_groups]
+
+        # partners[var][val]: facts of other variables sharing a group with (var, val)
+        partners = [[set() for _ in domain] for domain in var_domains]
+        for group in self.mutex_groups:
+            for var, val in group:
+                partners[var][val].update(fact for fact in group if fact[0] != var)
+        self.partners = partners
+
+        self.operators = []
+        self.num_pruned_ops = 0
+        for op in operators:
+            conditions = dict(op['prevails'])
+            effects = {}
+            for var, old, new in op['effects']:
+                if old >= 0:
+                    conditions[var] = old
+                effects[var] = new
+            result = dict(conditions)
+            result.update(effects)
+            if self._has_mutex(conditions) or self._has_mutex(result):
+                self.num_pruned_ops += 1
+                continue
+            fdr_op = FDROperator(len(self.operators), op['name'], tuple(sorted(conditions.items())),
+                                 tuple(sorted(effects.items())), op['cost'])
+            fdr_op.mutex_checks = tuple(sorted(
+                (var, val)
+                for effect in fdr_op.effects for var, val in partners[effect[0]][effect[1]]
+                if var not in result))
+            self.operators.append(fdr_op)
+
+    def _has_mutex(self, facts):
+        """True if a partial state, a dict var -> val, holds two facts of a group."""
+        partners = self.partners
+        return any(facts.get(other_var) == other_val
+                   for var, val in facts.items()
+                   for other_var, other_val in partners[var][val])
+
+    @property
+    def num_variables(self):
+        return len(self.variables)
+
+    def initial_state(self):
+        return self.init
+
+    def is_goal(self, state):
+        return all(state[var] == val for var, val in self.goal)
+
+    def apply(self, state, op):
+        """
+        Return the successor of a state under an applicable operator, or
+        None if it violates a mutex group.
+        """
+        for var, val in op.mutex_checks:
+            if state[var] == val:
+                return None
+        successor = self._thaw(state)
+        for var, val in op.effects:
+            successor[var] = val
+        return self._freeze(successor)
+
+    def strips_packer(self, task):
+        """
+        Return a function mapping a state to the packed state of the
+        compiled STRIPS task `task` of the same SAS file, with the atom of
+        every value of the state set. Heuristics of `task` evaluate the
+        result.
+        """
+        fact_bits = [tuple(1 << atom for atom in atoms) for atoms in task.var_atoms]
+
+        def pack(state):
+            mask = 0
+            for bits, val in zip(fact_bits, state):
+                mask |= bits[val]
+            return mask
+        return pack
+
+    def report(self):
+        return (f"FDR task: {self.num_variables} variable(s), {len(self.operators)} operator(s), "
+                f"{len(self.mutex_groups)} mutex group(s), {self.num_pruned_ops} operator(s) "
+                f"pruned by mutexes, {sys.getsizeof(self.init)} bytes per state")
+
+def load_fdr_task(filename):
+    """Parse a SAS file into an FDRTask."""
+    sas = stream_sas(filename)
+    return FDRTask(sas.variables, sas.var_domains, sas.initial_state, sas.goal_state,
+                   sas.operators, sas.mutex_groups)
+
+class _Node:
+    __slots__ = ('var', 'children', 'dont_care', 'ops')
+
+    def __init__(self, var, children, dont_care, ops):
+        self.var = var              # variable switched on, -1 for leaves
+        self.children = children    # child node (or None) indexed by value
+        self.dont_care = dont_care  # child node or None
+        self.ops = ops              # operators applicable at this node
+
+class FDRSuccessorGenerator:
+    """
+    Decision-tree successor generator over FDR states.
+
+    Like successor_generator.SuccessorGenerator, but an inner node indexes
+    its children by the value of its variable, so a lookup follows exactly
+    one value branch per node instead of testing one bit per value.
+    """
+
+    def __init__(self, task):
+        start = time.perf_counter()
+        self.domain_sizes = [len(domain) for domain in task.var_domains]
+        self.num_nodes = 0
+        self.root = self._build([(op, op.conditions) for op in task.operators])
+        self.build_time = time.perf_counter() - start
+
+    def _build(self, entries):
+        if not entries:
+            return None
+
+        ops = [op for op, conditions in entries if not conditions]
+        pending = [entry for entry in entries if entry[1]]
+        var = -1
+        children = ()
+        dont_care = None
+        if pending:
+            var = min(conditions[0][0] for op, conditions in pending)
+            by_value = [[] for _ in range(self.domain_sizes[var])]
+            rest = []
+            for op, conditions in pending:
+                if conditions[0][0] == var:
+                    by_value[conditions[0][1]].append((op, conditions[1:]))
+                else:
+                    rest.append((op, conditions))
+            children = [self._build(branch) for branch in by_value]
+            dont_care = self._build(rest)
+
+        self.num_nodes += 1
+        return _Node(var, children, dont_care, ops)
+
+    def get_applicable(self, state):
+        """Return the operators applicable in an FDR state, ordered by operator ID."""
+        applicable = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            if node.ops:
+                applicable.extend(node.ops)
+            if node.var >= 0:
+                child = node.children[state[node.var]]
+                if child is not None:
+                    stack.append(child)
+            if node.dont_care is not None:
+                stack.append(node.dont_care)
+        applicable.sort(key=attrgetter('index'))
+        return applicable
+
+    def report(self):
+        return (f"FDR successor generator: {self.num_nodes} nodes, "
+                f"built in {self.build_time:.3f}s")
@@ -0,0 +1,374 @@
+"""
+Hash-distributed A* (HDA*, Kishimoto et al., 2009) across processes.
+
+Every state is owned by one worker process, chosen by hashing the packed
+state. A worker keeps the open and closed lists of its own states only:
+it expands the best of them, and sends every generated successor to its
+owner. Successors are buffered per owner and sent in batches through the
+owner's multiprocessing queue; a worker inserts its own successors
+directly.
+
+A goal expanded by a worker is an incumbent plan. The coordinator (the
+calling process) broadcasts the cheapest incumbent cost as a bound, and
+workers never expand nodes with f >= bound. The incumbent is optimal
+once no worker has a node with f < bound left and no batch of states is
+in transit. The coordinator detects this with waves of probes: every
+worker answers with whether it is idle and the number of states it has
+sent and received (Mattern's four-counter method). Two consecutive waves
+in which all workers are idle, with the same counts and as many states
+received as sent, prove termination. The plan is then traced back by
+asking the owners of its states for their parent pointers.
+"""
+
+import os
+import math
+import time
+import heapq
+import multiprocessing
+from queue import Empty
+from search_statistics import SearchStatistics
+
+# Nodes expanded by a worker between two looks at its inbox
+EXPANSIONS_PER_ROUND = 32
+# Seconds the coordinator waits for a message before checking that the workers live
+POLL_INTERVAL = 1.0
+
+def owner_of(state, num_workers):
+    """Return the ID of the worker that owns a packed state."""
+    return ((hash(state) * 0x9E3779B97F4A7C15) >> 40) % num_workers
+
+class _Worker:
+    """The search state of one worker process (see _run_worker)."""
+
+    def __init__(self, worker_id, task, heuristic_name, successor_generator_name,
+                 inboxes, results, batch_size):
+        from planner import make_heuristic
+        from successor_generator import SUCCESSOR_GENERATORS
+        self.worker_id = worker_id
+        self.task = task
+        self.heuristic = make_heuristic(heuristic_name, task)
+        self.successor_generator = SUCCESSOR_GENERATORS[successor_generator_name](task)
+        self.inboxes = inboxes
+        self.inbox = inboxes[worker_id]
+        self.results = results
+        self.batch_size = batch_size
+        self.num_workers = len(inboxes)
+
+        self.nodes = {}  # packed state -> [g, h, parent state, creating operator ID]
+        self.open_list = []  # (f, h, state) entries
+        self.buffers = [[] for _ in inboxes]
+        self.bound = math.inf
+        self.sent = 0
+        self.received = 0
+        self.reported_idle = False
+        self.statistics = SearchStatistics()
+        self.batches = 0
+
+    def run(self):
+        while True:
+            if self._has_work():
+                # Take in everything that has arrived, then expand a round
+                while True:
+                    try:
+                        message = self.inbox.get_nowait()
+                    except Empty:
+                        break
+                    if not self._handle(message):
+                        return
+                self._expand(EXPANSIONS_PER_ROUND)
+                self._flush()
+            else:
+                if not self.reported_idle:
+                    self.results.put(('idle', self.worker_id))
+                    self.reported_idle = True
+                if not self._handle(self.inbox.get()):
+                    return
+
+    def _has_work(self):
+        open_list = self.open_list
+        while open_list:
+            f, h, state = open_list[0]
+            if f >= self.bound:
+                return False
+            if self.nodes[state][0] + h < f:
+                heapq.heappop(open_list)  # Stale entry
+                continue
+            return True
+        return False
+
+    def _handle(self, message):
+        """Process one inbox message; returns False to stop the worker."""
+        kind = message[0]
+        if kind == 'states':
+            batch = message[1]
+            self.received += len(batch)
+            self.reported_idle = False
+            for state, g, parent, op_id in batch:
+                self._insert(state, g, parent, op_id)
+        elif kind == 'bound':
+            self.bound = min(self.bound, message[1])
+        elif kind == 'probe':
+            self.results.put(('probe', message[1], self.worker_id, not self._has_work(),
+                              self.sent, self.received))
+        elif kind == 'trace':
+            _, _, parent, op_id = self.nodes[message[1]]
+            self.results.put(('trace', parent, op_id))
+        elif kind == 'stop':
+            self.results.put(('done', self.worker_id, self.statistics.as_dict(), self.batches))
+            return False
+        return True
+
+    def _insert(self, state, g, parent, op_id):
+        node = self.nodes.get(state)
+        if node is None:
+            self.statistics.evaluated += 1
+            h = self.heuristic(state)
+            self.nodes[state] = [g, h, parent, op_id]
+            if h == math.inf:
+                self.statistics.dead_ends += 1
+                return
+        elif g < node[0]:
+            h = node[1]
+            if h == math.inf:
+                return
+            node[0], node[2], node[3] = g, parent, op_id
+        else:
+            return
+        if g + h < self.bound:
+            heapq.heappush(self.open_list, (g + h, h, state))
+
+    def _expand(self, limit):
+        task = self.task
+        goal_mask = task.goal_mask
+        get_applicable = self.successor_generator.get_applicable
+        statistics = self.statistics
+        nodes = self.nodes
+        buffers = self.buffers
+        num_workers = self.num_workers
+        worker_id = self.worker_id
+        for _ in range(limit):
+            if not self._has_work():
+                return
+            f, h, state = heapq.heappop(self.open_list)
+            g = nodes[state][0]
+            statistics.expanded += 1
+            if state & goal_mask == goal_mask:
+                # With an admissible heuristic no open node is cheaper than f
+                self.bound = g
+                self.results.put(('solution', g, state))
+                continue
+
+            applicable_ops = get_applicable(state)
+            statistics.generated += len(applicable_ops)
+            for op in applicable_ops:
+                next_state = (state & op.keep_mask) | op.add_mask
+                new_g = g + op.cost
+                if new_g >= self.bound:
+                    continue
+                owner = owner_of(next_state, num_workers)
+                if owner == worker_id:
+                    self._insert(next_state, new_g, state, op.index)
+                else:
+                    buffer = buffers[owner]
+                    buffer.append((next_state, new_g, state, op.index))
+                    if len(buffer) >= self.batch_size:
+                        self._send(owner)
+
+    def _send(self, owner):
+        batch = self.buffers[owner]
+        self.buffers[owner] = []
+        self.sent += len(batch)
+        self.batches += 1
+        self.inboxes[owner].put(('states', batch))
+
+    def _flush(self):
+        for owner, buffer in enumerate(self.buffers):
+            if buffer:
+                self._send(owner)
+
+def _run_worker(*args):
+    _Worker(*args).run()
+
+class HDAStar:
+    """
+    Hash-distributed A* in `workers` processes.
+
+    The heuristic and successor generator are given by name and built in
+    every worker (see planner.make_heuristic and
+    successor_generator.SUCCESSOR_GENERATORS); only packed states, g
+    values and parent pointers cross process boundaries.
+
+    Attributes:
+        worker_statistics: Counters of every worker, as dicts
+        waves: Number of termination probe waves
+    """
+
+    def __init__(self, task, heuristic_name, workers=None, successor_generator_name='tree',
+                 statistics=None, batch_size=64):
+        self.task = task
+        self.heuristic_name = heuristic_name
+        self.workers = workers or os.cpu_count()
+        self.successor_generator_name = successor_generator_name
+        self.statistics = statistics if statistics is not None else SearchStatistics()
+        self.batch_size = batch_size
+        self.worker_statistics = []
+        self.batches = 0
+        self.waves = 0
+        self.search_time = 0.0
+        self._processes = []
+
+    def run(self):
+        """
+        Search with all workers and shut them down.
+
+        Returns:
+            (plan, cost) tuple where plan is a list of operator names or
+            None if no plan exists
+
+        Raises:
+            RuntimeError: if a worker process dies; the others are terminated
+        """
+        start = time.perf_counter()
+        context = multiprocessing.get_context()
+        inboxes = [context.Queue() for _ in range(self.workers)]
+        results = context.Queue()
+        processes = [context.Process(target=_run_worker, daemon=True,
+                                     args=(i, self.task, self.heuristic_name,
+                                           self.successor_generator_name, inboxes, results,
+                                           self.batch_size))
+                     for i in range(self.workers)]
+        self._processes = processes
+        for process in processes:
+            process.start()
+        try:
+            initial_state = self.task.initial_state()
+            inboxes[owner_of(initial_state, self.workers)].put(
+                ('states', [(initial_state, 0, None, -1)]))
+            best_cost, best_state = self._coordinate(inboxes, results, initial_sent=1)
+            plan = None
+            if best_state is not None:
+                plan = self._trace(best_state, inboxes, results)
+            for inbox in inboxes:
+                inbox.put(('stop',))
+            self._collect(results)
+        except BaseException:
+            for process in processes:
+                process.terminate()
+            raise
+        finally:
+            for process in processes:
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+        self.search_time = time.perf_counter() - start
+        if plan is None:
+            return None, math.inf
+        return [self.task.operators[op_id].name for op_id in plan], best_cost
+
+    def _receive(self, results, stopped=()):
+        """
+        Wait for the next message from the workers.
+
+        Raises:
+            RuntimeError: if a worker not in `stopped` has exited
+        """
+        while True:
+            try:
+                return results.get(timeout=POLL_INTERVAL)
+            except Empty:
+                pass
+            for worker_id, process in enumerate(self._processes):
+                if worker_id not in stopped and not process.is_alive():
+                    raise RuntimeError(f"HDA* worker {worker_id} died "
+                                       f"(exit code {process.exitcode})")
+
+    def _coordinate(self, inboxes, results, initial_sent):
+        """
+        Broadcast incumbents and run probe waves until termination.
+
+        Returns:
+            (cost, goal state) of the best plan, (math.inf, None) if there is none
+        """
+        best_cost, best_state = math.inf, None
+        idle = set()
+        wave = None          # ID of the running wave
+        replies = {}
+        previous = None      # (sent, received) counts of the last successful wave
+        while True:
+            message = self._receive(results)
+            kind = message[0]
+            if kind == 'solution':
+                _, cost, state = message
+                if cost < best_cost:
+                    best_cost, best_state = cost, state
+                    for inbox in inboxes:
+                        inbox.put(('bound', cost))
+            elif kind == 'idle':
+                idle.add(message[1])
+            elif kind == 'probe' and message[1] == wave:
+                _, _, worker_id, is_idle, sent, received = message
+                replies[worker_id] = (is_idle, sent, received)
+                if len(replies) < self.workers:
+                    continue
+                wave = None
+                counts = [(sent, received) for _, sent, received in
+                          (replies[i] for i in range(self.workers))]
+                total_sent = initial_sent + sum(sent for sent, _ in counts)
+                total_received = sum(received for _, received in counts)
+                if all(is_idle for is_idle, _, _ in replies.values()) \
+                        and total_sent == total_received:
+                    if counts == previous:
+                        return best_cost, best_state
+                    previous = counts
+                    idle = set(range(self.workers))  # Confirm with a second wave
+                else:
+                    previous = None
+                    idle = {i for i, (is_idle, _, _) in replies.items() if is_idle}
+            if wave is None and len(idle) == self.workers:
+                self.waves += 1
+                wave = self.waves
+                replies = {}
+                for inbox in inboxes:
+                    inbox.put(('probe', wave))
+
+    def _trace(self, goal_state, inboxes, results):
+        """Follow the parent pointers of the goal state through their owners."""
+        plan = []
+        state = goal_state
+        while True:
+            inboxes[owner_of(state, self.workers)].put(('trace', state))
+            message = self._receive(results)
+            while message[0] != 'trace':
+                message = self._receive(results)  # Late messages of the search
+            _, parent, op_id = message
+            if parent is None:
+                break
+            plan.append(op_id)
+            state = parent
+        plan.reverse()
+        return plan
+
+    def _collect(self, results):
+        """Sum up the counters the workers send when they stop."""
+        statistics = self.statistics
+        stopped = set()
+        while len(stopped) < self.workers:
+            message = self._receive(results, stopped)
+            if message[0] != 'done':
+                continue
+            _, worker_id, counters, batches = message
+            stopped.add(worker_id)
+            self.worker_statistics.append(counters)
+            self.batches += batches
+            statistics.expanded += counters['expanded']
+            statistics.generated += counters['generated']
+            statistics.evaluated += counters['evaluated']
+            statistics.dead_ends += counters['dead_ends']
+
+    def report(self):
+        expanded = sorted(counters['expanded'] for counters in self.worker_statistics)
+        rate = self.statistics.expanded / self.search_time if self.search_time else 0.0
+        return (f"HDA*: {self.workers} worker(s), expanded per worker min {expanded[0]} / "
+                f"max {expanded[-1]}, {rate:.0f} expansions/s, {self.batches} batch(es) sent, "
+                f"{self.waves} termination wave(s)" if expanded else
+                f"HDA*: {self.workers} worker(s)")
@@ -5,90 +5,344 @@ Compute the Hₘₐₓ heuristic value for the initial state of a SAS file.
 
 import sys
 import math
-from sas_parser import parse_sas, to_strips
+import heapq
+from task_cache import load_task_cached
+from sas_parser import unpack_atoms
 
-def compute_hmax(init_atoms, goal_atoms, strips_ops):
+def hmax_values(task, state, costs=None, stop_at_goal=True, supporters=None, op_values=None):
     """
-    Compute the h_max heuristic value for a given state.
+    Compute h^max values of all facts with a generalized Dijkstra search.
     
-    In the delete-relaxation, we ignore delete effects and assume facts
-    once achieved remain true. This makes h_max admissible.
+    Facts are settled in order of increasing cost. Every operator keeps a
+    counter of unsatisfied preconditions and fires exactly once, when its
+    last (and therefore most expensive) precondition is settled.
     
     Args:
-        init_atoms: List of atoms true in the initial state
-        goal_atoms: List of atoms that must be true in the goal state
-        strips_ops: List of operators in STRIPS format (dictionaries with name, pre, add, del, cost)
+        task: Compiled Task (see sas_parser.compile_task)
+        state: Iterable of atom IDs true in the state
+        costs: Optional operator costs indexed by operator ID (default: op.cost)
+        stop_at_goal: Stop as soon as all goal atoms are settled. Values of
+            facts that are not settled by then are only upper bounds.
+        supporters: Optional list with a -1 entry per atom; the ID of the
+            operator that last lowered the value of a fact is written to it
+            (facts of the state keep -1)
+        op_values: Optional list with a math.inf entry per operator; the
+            cost of every operator that becomes applicable plus the value
+            of its most expensive precondition is written to it
         
     Returns:
-        The h_max value (max over all goal facts)
+        List of h^max values indexed by atom ID (math.inf if unreachable)
     """
-    # Initialize h-values: h(fact) = 0 if fact is in initial state, else infinity
-    h_values = {}
+    operators = task.operators
+    precondition_of = task.precondition_of
+    unsatisfied = task.num_pre.copy()
+    h_values = [math.inf] * task.num_atoms
+    queue = []
     
-    # Set initial state atoms to 0, all others to infinity
-    for atom in init_atoms:
+    for atom in state:
         h_values[atom] = 0
+        queue.append((0, atom))
+    
+    # Operators without preconditions are applicable right away
+    for op in operators:
+        if not op.pre:
+            cost = op.cost if costs is None else costs[op.index]
+            if op_values is not None:
+                op_values[op.index] = cost
+            for atom in op.add:
+                if cost < h_values[atom]:
+                    h_values[atom] = cost
+                    if supporters is not None:
+                        supporters[atom] = op.index
+                    queue.append((cost, atom))
+    heapq.heapify(queue)
     
-    # Bellman-Ford style relaxation until fixpoint
-    changed = True
-    iteration = 0
+    goal = set(task.goal)
+    remaining_goals = len(goal)
+    if stop_at_goal and not remaining_goals:
+        return h_values
     
-    while changed:
-        iteration += 1
-        changed = False
+    while queue:
+        cost, atom = heapq.heappop(queue)
+        if cost > h_values[atom]:
+            continue  # Stale queue entry
         
-        for op in strips_ops:
-            # Check if all preconditions are reachable
-            max_pre_h = 0
-            all_preconditions_reachable = True
-            
-            for precond in op['pre']:
-                if precond not in h_values:
-                    h_values[precond] = math.inf  # Initialize if not seen before
-                
-                if h_values[precond] == math.inf:
-                    all_preconditions_reachable = False
-                    break
-                max_pre_h = max(max_pre_h, h_values[precond])
-            
-            if not all_preconditions_reachable:
+        if atom in goal:
+            remaining_goals -= 1
+            if stop_at_goal and not remaining_goals:
+                break
+        
+        for op_id in precondition_of[atom]:
+            unsatisfied[op_id] -= 1
+            if unsatisfied[op_id]:
                 continue
             
-            # Operator is applicable, compute new h-value for its effects
-            new_h = max_pre_h + op['cost']
-            
-            # Update add effects (delete effects are ignored in h_max)
-            for add_atom in op['add']:
-                if add_atom not in h_values:
+            # All preconditions settled; this one was the most expensive
+            op = operators[op_id]
+            new_h = cost + (op.cost if costs is None else costs[op_id])
+            if op_values is not None:
+                op_values[op_id] = new_h
+            for add_atom in op.add:
+                if new_h < h_values[add_atom]:
                     h_values[add_atom] = new_h
-                    changed = True
-                elif new_h < h_values[add_atom]:
-                    h_values[add_atom] = new_h
-                    changed = True
+                    if supporters is not None:
+                        supporters[add_atom] = op_id
+                    heapq.heappush(queue, (new_h, add_atom))
     
-    # Check if all goal atoms are reachable
-    max_goal_h = 0
-    for goal_atom in goal_atoms:
-        if goal_atom not in h_values:
-            h_values[goal_atom] = math.inf
+    return h_values
+
+def compute_hmax(task, state):
+    """
+    Compute the h_max heuristic value for a given state.
+    
+    In the delete-relaxation, we ignore delete effects and assume facts
+    once achieved remain true. This makes h_max admissible.
+    
+    Args:
+        task: Compiled Task (see sas_parser.compile_task)
+        state: Iterable of atom IDs true in the state
         
-        if h_values[goal_atom] == math.inf:
-            return math.inf  # Goal unreachable
+    Returns:
+        The h_max value (max over all goal facts)
+    """
+    h_values = hmax_values(task, state)
+    
+    # The goal is as expensive as its most expensive atom (inf if unreachable)
+    return max((h_values[atom] for atom in task.goal), default=0)
+
+class IncrementalHmax:
+    """
+    h^max evaluated by repairing the parent's cost tables.
+    
+    Every state has three tables: the h^max value of every fact, its
+    supporter (the operator its value was last lowered by, -1 for facts of
+    the state) and the value of every operator (its cost plus the value of
+    its most expensive precondition). For a successor only the changes are
+    propagated. When a fact is reset, the operators it is a precondition
+    of become inapplicable, and every fact they support first looks for
+    another achiever of positive cost with the same value, as LPA*
+    re-supports a vertex from another predecessor; only if there is none
+    is the fact reset in turn. Reset facts are then recomputed from the
+    values of their achievers, added facts drop to 0, and all changed
+    values are propagated in increasing order. Values are exactly those of
+    compute_hmax.
+    
+    The data passed between calls is copy-on-write: the parent's complete
+    tables and dicts of the fact and operator entries that differ. The
+    complete tables of a state are only built when it is expanded, and the
+    changes for a successor are made in place and undone.
+    
+    If more than `max_reset_share` of the facts are reset, the repair would
+    cost more than a fresh exploration, and the tables are recomputed
+    instead. A repair costs about 4.5us per changed fact against about
+    2.4us per fact for a fresh exploration, and the facts lowered by the
+    added facts come on top of the reset ones: on elevators01 (61 facts),
+    where every operator resets at least a fifth of the facts, a repair
+    takes 350-690us against 170us from scratch. The default therefore
+    only repairs local changes.
+    
+    States are packed (see sas_parser.pack_atoms).
+    """
+    
+    def __init__(self, task, max_reset_share=0.1):
+        self.task = task
+        self.op_costs = [op.cost for op in task.operators]
+        self.op_pre = [op.pre for op in task.operators]
+        self.op_add = [op.add for op in task.operators]
+        self.op_delete = [op.delete for op in task.operators]
+        self.precondition_of = task.precondition_of
+        achievers = [[] for _ in range(task.num_atoms)]
+        for op in task.operators:
+            for atom in op.add:
+                achievers[atom].append(op.index)
+        self.achievers = achievers
+        self.goal = task.goal
+        self.max_reset = int(task.num_atoms * max_reset_share)
+        self.from_scratch = 0
+        self.incremental = 0
+        self.updates = 0      # fact values reset or settled by incremental evaluations
+        self.resupported = 0  # facts kept at their value by another achiever
+        self._expanded = None  # (data, tables) of the last state successors were evaluated for
+    
+    def evaluate(self, state):
+        """Return (h, data) of a packed state, computed from scratch."""
+        self.from_scratch += 1
+        # Run to the end so that the tables are complete
+        supporters = [-1] * self.task.num_atoms
+        op_values = [math.inf] * len(self.op_costs)
+        h_values = hmax_values(self.task, unpack_atoms(state), stop_at_goal=False,
+                               supporters=supporters, op_values=op_values)
+        return self._goal_value(h_values), ((h_values, supporters, op_values), {}, {})
+    
+    def _tables(self, data):
+        """Return the complete tables of a state, building them once per state."""
+        if self._expanded is not None and self._expanded[0] is data:
+            return self._expanded[1]
+        tables, fact_changes, op_changes = data
+        if fact_changes or op_changes:
+            h_values, supporters, op_values = (table.copy() for table in tables)
+            for atom, (h, supporter) in fact_changes.items():
+                h_values[atom] = h
+                supporters[atom] = supporter
+            for op_id, value in op_changes.items():
+                op_values[op_id] = value
+            tables = h_values, supporters, op_values
+        self._expanded = (data, tables)
+        return tables
+    
+    def evaluate_successor(self, data, op_id, state):
+        """
+        Return (h, data) of the packed state reached by applying operator
+        `op_id` in the state whose data is given.
+        """
+        tables = self._tables(data)
+        h_values, supporters, op_values = tables
+        saved_facts = {}  # atom -> (h, supporter) before this evaluation changed it
+        saved_ops = {}    # operator ID -> value before this evaluation changed it
+        try:
+            h = self._repair(tables, saved_facts, saved_ops, op_id, state)
+            if h is None:
+                return self.evaluate(state)
+            fact_changes = {atom: (h_values[atom], supporters[atom]) for atom in saved_facts}
+            op_changes = {op: op_values[op] for op in saved_ops}
+            return h, (tables, fact_changes, op_changes)
+        finally:
+            for atom, (value, supporter) in saved_facts.items():
+                h_values[atom] = value
+                supporters[atom] = supporter
+            for op, value in saved_ops.items():
+                op_values[op] = value
+    
+    def _repair(self, tables, saved_facts, saved_ops, op_id, state):
+        """
+        Change the parent's tables in place into those of the successor,
+        recording the old entries.
+        
+        Returns:
+            h of the successor, or None if too many facts are reset
+        """
+        h_values, supporters, op_values = tables
+        precondition_of = self.precondition_of
+        achievers = self.achievers
+        op_costs = self.op_costs
+        op_add = self.op_add
+        
+        def reset_fact(atom):
+            if atom not in saved_facts:
+                saved_facts[atom] = (h_values[atom], supporters[atom])
+            h_values[atom] = math.inf
+            supporters[atom] = -1
+            for dependent_op in precondition_of[atom]:
+                if op_values[dependent_op] != math.inf:
+                    if dependent_op not in saved_ops:
+                        saved_ops[dependent_op] = op_values[dependent_op]
+                    op_values[dependent_op] = math.inf
         
-        max_goal_h = max(max_goal_h, h_values[goal_atom])
+        # Reset every fact whose value was derived from a deleted fact and
+        # that no other achiever supports at the same value
+        reset = [atom for atom in self.op_delete[op_id] if not state >> atom & 1]
+        for atom in reset:
+            reset_fact(atom)
+        for atom in reset:  # Grows while it is iterated
+            for dependent_op in precondition_of[atom]:
+                for add_atom in op_add[dependent_op]:
+                    if supporters[add_atom] != dependent_op:
+                        continue
+                    value = h_values[add_atom]
+                    for achiever in achievers[add_atom]:
+                        # Zero-cost achievers could support a fact by itself
+                        if op_values[achiever] == value and op_costs[achiever] > 0:
+                            if add_atom not in saved_facts:
+                                saved_facts[add_atom] = (value, dependent_op)
+                            supporters[add_atom] = achiever
+                            self.resupported += 1
+                            break
+                    else:
+                        reset_fact(add_atom)
+                        reset.append(add_atom)
+            if len(reset) > self.max_reset:
+                # Most of the table changes; recomputing it is cheaper
+                return None
+        
+        self.incremental += 1
+        queue = []
+        for atom in op_add[op_id]:
+            if h_values[atom] != 0:
+                if atom not in saved_facts:
+                    saved_facts[atom] = (h_values[atom], supporters[atom])
+                h_values[atom] = 0
+                supporters[atom] = -1
+                queue.append((0, atom))
+        
+        # Recompute the reset facts from achievers that are still applicable
+        for atom in reset:
+            for achiever in achievers[atom]:
+                if op_values[achiever] < h_values[atom]:
+                    h_values[atom] = op_values[achiever]
+                    supporters[atom] = achiever
+            if h_values[atom] != math.inf:
+                queue.append((h_values[atom], atom))
+        heapq.heapify(queue)
+        self.updates += len(reset) + self._propagate(tables, saved_facts, saved_ops, queue)
+        return self._goal_value(h_values)
+    
+    def _propagate(self, tables, saved_facts, saved_ops, queue):
+        """
+        Propagate changed fact values in increasing order; an operator is
+        re-evaluated when one of its preconditions settles at a value that
+        can lower it.
+        
+        Returns:
+            Number of facts settled
+        """
+        h_values, supporters, op_values = tables
+        precondition_of = self.precondition_of
+        op_costs = self.op_costs
+        op_pre = self.op_pre
+        op_add = self.op_add
+        settled = 0
+        while queue:
+            cost, atom = heapq.heappop(queue)
+            if cost > h_values[atom]:
+                continue  # Stale queue entry
+            settled += 1
+            for op_id in precondition_of[atom]:
+                # The operator costs at least this much; if it already did, it is unchanged
+                if op_values[op_id] <= op_costs[op_id] + cost:
+                    continue
+                new_h = op_costs[op_id] + max(map(h_values.__getitem__, op_pre[op_id]))
+                if new_h == op_values[op_id]:
+                    continue
+                if op_id not in saved_ops:
+                    saved_ops[op_id] = op_values[op_id]
+                op_values[op_id] = new_h
+                for add_atom in op_add[op_id]:
+                    if new_h < h_values[add_atom]:
+                        if add_atom not in saved_facts:
+                            saved_facts[add_atom] = (h_values[add_atom], supporters[add_atom])
+                        h_values[add_atom] = new_h
+                        supporters[add_atom] = op_id
+                        heapq.heappush(queue, (new_h, add_atom))
+        return settled
+    
+    def _goal_value(self, h_values):
+        return max((h_values[atom] for atom in self.goal), default=0)
     
-    return max_goal_h
+    def report(self):
+        evaluations = self.from_scratch + self.incremental
+        updates = self.updates / self.incremental if self.incremental else 0.0
+        return (f"Incremental h^max: {self.incremental} of {evaluations} evaluation(s) "
+                f"incremental, {updates:.1f} fact update(s) per evaluation "
+                f"({self.task.num_atoms} facts), {self.resupported} fact(s) re-supported")
 
 def main():
     if len(sys.argv) != 2:
         print("Usage: python hmax.py <task>.sas")
         sys.exit(1)
     
-    # Use the new parser functions
-    vars_, domains, init_state, goal_state, ops = parse_sas(sys.argv[1])
-    init_atoms, goal_atoms, strips_ops = to_strips(domains, init_state, goal_state, ops)
+    task = load_task_cached(sys.argv[1])
     
-    h = compute_hmax(init_atoms, goal_atoms, strips_ops)
+    h = compute_hmax(task, task.init)
     print(h)
 
 if __name__ == "__main__":
@@ -0,0 +1,206 @@
+"""
+Memory-bounded optimal search: IDA* with an optional transposition table.
+
+IDA* runs a series of depth-first searches, each bounded by an f value;
+the next bound is the smallest f value that exceeded the current one.
+Memory grows with the length of the current path, not with the number
+of states visited, so large tasks run out of time rather than memory.
+
+The transposition table is a fixed-size, direct-mapped table of packed
+states. It remembers the heuristic value of every state it holds, so
+states reached again are not evaluated again, and the g value at which
+a state was expanded in the current iteration: a state reached again in
+the same iteration at the same or higher g cannot lead to a plan the
+first visit missed and is pruned. Colliding states simply replace each
+other, which only weakens pruning, never optimality.
+"""
+
+import sys
+import math
+from array import array
+from search_statistics import SearchStatistics
+from successor_generator import SuccessorGenerator
+
+class TranspositionTable:
+    """
+    Direct-mapped table of (state, g, h, iteration) entries.
+
+    Slots are picked by the hash of the packed state; a new state always
+    replaces the one in its slot. g is -1 for states whose heuristic value
+    is known but that were not expanded in the recorded iteration.
+    """
+
+    # Estimated bytes per slot besides the state itself (list slots, h, g, iteration)
+    SLOT_OVERHEAD = 8 + 8 + 8 + 4
+
+    def __init__(self, size):
+        self.size = size
+        self.states = [None] * size
+        self.h = [0] * size
+        self.g = array('q', [-1]) * size
+        self.iteration = array('i', [0]) * size
+        self.hits = 0
+        self.misses = 0
+        self.replacements = 0
+
+    def _slot(self, state):
+        # Packed states differ mostly in high bits, which hash() keeps as
+        # they are; mix them into the low bits before taking the modulus
+        return ((hash(state) * 0x9E3779B97F4A7C15) >> 32) % self.size
+
+    def lookup(self, state):
+        """Return the slot holding `state`, or -1."""
+        slot = self._slot(state)
+        if self.states[slot] == state:
+            self.hits += 1
+            return slot
+        self.misses += 1
+        return -1
+
+    def store(self, state, h, g, iteration):
+        slot = self._slot(state)
+        old_state = self.states[slot]
+        if old_state is not None and old_state != state:
+            self.replacements += 1
+        self.states[slot] = state
+        self.h[slot] = h
+        self.g[slot] = g
+        self.iteration[slot] = iteration
+
+    def memory(self):
+        """Approximate size of the table in bytes."""
+        states = sum(sys.getsizeof(state) for state in self.states if state is not None)
+        return self.size * self.SLOT_OVERHEAD + states
+
+    def report(self):
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups if lookups else 0.0
+        used = sum(state is not None for state in self.states)
+        return (f"Transposition table: {used}/{self.size} slots used, {self.hits} hits "
+                f"({rate:.1%} hit rate), {self.replacements} replacements "
+                f"(~{self.memory() / 1024:.1f} KiB)")
+
+def idastar(task, heuristic_fn, successor_generator=None, table=None, statistics=None):
+    """
+    IDA* search.
+
+    Args:
+        task: Compiled Task (see sas_parser.compile_task)
+        heuristic_fn: Function that takes a packed state and returns a heuristic value
+        successor_generator: Object whose get_applicable(state) returns the
+            applicable operators (default: a decision-tree SuccessorGenerator)
+        table: Optional TranspositionTable
+        statistics: Optional SearchStatistics to fill in; every iteration
+            counts as an f layer
+
+    Returns:
+        (plan, cost) tuple where plan is a list of operator names or None if no plan exists
+    """
+    if successor_generator is None:
+        successor_generator = SuccessorGenerator(task)
+    if statistics is None:
+        statistics = SearchStatistics()
+
+    initial_state = task.initial_state()
+    statistics.evaluated += 1
+    bound = heuristic_fn(initial_state)
+    if bound == math.inf:
+        statistics.dead_ends += 1
+        return None, math.inf
+
+    while True:
+        statistics.iterations += 1
+        if statistics.detailed:
+            statistics.new_f_layer(bound)
+        plan, cost, bound = _bounded_dfs(task, initial_state, bound, heuristic_fn,
+                                         successor_generator, table, statistics)
+        if plan is not None:
+            return [task.operators[op_id].name for op_id in plan], cost
+        if bound == math.inf:
+            return None, math.inf
+
+def _bounded_dfs(task, initial_state, bound, heuristic_fn, successor_generator, table,
+                 statistics):
+    """
+    Depth-first search of all paths with f <= bound.
+
+    Returns:
+        (plan, cost, next_bound) where plan is a list of operator IDs or
+        None, and next_bound is the smallest f value above `bound` (math.inf
+        if there is none)
+    """
+    goal_mask = task.goal_mask
+    get_applicable = successor_generator.get_applicable
+    iteration = statistics.iterations
+
+    if initial_state & goal_mask == goal_mask:
+        return [], 0, bound
+
+    # The current path: states, their g values, operator IDs between them
+    # and an iterator over the remaining operators of every state on it
+    path_states = [initial_state]
+    path_g = [0]
+    path_ops = []
+    on_path = {initial_state}
+    applicable_ops = get_applicable(initial_state)
+    statistics.expanded += 1
+    statistics.generated += len(applicable_ops)
+    pending = [iter(applicable_ops)]
+    next_bound = math.inf
+
+    while pending:
+        op = next(pending[-1], None)
+        if op is None:
+            # Every successor was tried; backtrack
+            pending.pop()
+            on_path.discard(path_states.pop())
+            path_g.pop()
+            if path_ops:
+                path_ops.pop()
+            continue
+
+        state = (path_states[-1] & op.keep_mask) | op.add_mask
+        if state in on_path:
+            continue  # Cycles never shorten a plan
+        g = path_g[-1] + op.cost
+
+        h = None
+        if table is not None:
+            slot = table.lookup(state)
+            if slot >= 0:
+                if table.iteration[slot] == iteration and 0 <= table.g[slot] <= g:
+                    continue  # Already expanded in this iteration at least as cheaply
+                h = table.h[slot]
+        if h is None:
+            statistics.evaluated += 1
+            h = heuristic_fn(state)
+        if h == math.inf:
+            statistics.dead_ends += 1
+            if table is not None:
+                table.store(state, h, -1, iteration)
+            continue
+
+        f = g + h
+        if f > bound:
+            if f < next_bound:
+                next_bound = f
+            if table is not None:
+                table.store(state, h, -1, iteration)
+            continue
+        if table is not None:
+            table.store(state, h, g, iteration)
+
+        path_ops.append(op.index)
+        if state & goal_mask == goal_mask:
+            return path_ops, g, bound
+
+        # Expand the successor
+        path_states.append(state)
+        path_g.append(g)
+        on_path.add(state)
+        applicable_ops = get_applicable(state)
+        statistics.expanded += 1
+        statistics.generated += len(applicable_ops)
+        pending.append(iter(applicable_ops))
+
+    return None, math.inf, next_bound
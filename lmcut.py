@@ -6,212 +6,331 @@ with deterministic tie-breaking in the justification graph.
 
 import sys
 import math
-import copy
-from collections import defaultdict
-from sas_parser import parse_sas, to_strips
+import heapq
+from task_cache import load_task_cached
+from sas_parser import unpack_atoms
 
-def compute_hmax_values(init_atoms, goal_atoms, strips_ops, artificial_goal=None):
+# Status of a fact during the cut computation
+UNREACHED = 0
+BEFORE_GOAL_ZONE = 1
+GOAL_ZONE = 2
+
+class LandmarkCut:
     """
-    Compute h^max values for all facts.
-    
-    In the delete-relaxation, we ignore delete effects and assume facts
-    once achieved remain true.
+    LM-Cut heuristic (Helmert & Domshlak, 2009) over a compiled Task.
+
+    All per-evaluation data lives in flat lists indexed by fact or operator
+    ID that are allocated once and reused by every call. Operators are only
+    referred to by index. After each cut, h^max is updated incrementally by
+    propagating the cost decreases of the cut operators instead of being
+    recomputed from scratch.
+
+    The relaxed task adds two artificial facts: one that holds in every
+    state (the precondition of operators without preconditions) and the
+    artificial goal, achieved by a zero-cost goal operator.
     """
-    # Initialize h-values
-    h_values = {}
-    
-    # Set initial atoms to 0
-    for atom in init_atoms:
-        h_values[atom] = 0
-    
-    # Add artificial goal if provided
-    if artificial_goal:
-        h_values[artificial_goal] = math.inf
-    
-    # Fixed-point computation for h^max
-    changed = True
-    while changed:
-        changed = False
-        for op in strips_ops:
-            # Skip operators with unreachable preconditions
-            max_pre_h = 0
-            achievable = True
-            
-            for precond in op['pre']:
-                if precond not in h_values:
-                    h_values[precond] = math.inf
-                    achievable = False
-                    break
-                
-                if h_values[precond] == math.inf:
-                    achievable = False
-                    break
-                
-                max_pre_h = max(max_pre_h, h_values[precond])
-            
-            if not achievable:
+
+    def __init__(self, task):
+        self.task = task
+        num_atoms = task.num_atoms
+        num_ops = len(task.operators)
+
+        self.artificial_pre = num_atoms
+        self.artificial_goal = num_atoms + 1
+        self.goal_op = num_ops
+
+        # Relaxed operators: task operators followed by the goal operator
+        self.pre = [op.pre or (self.artificial_pre,) for op in task.operators]
+        self.pre.append(task.goal or (self.artificial_pre,))
+        self.add = [op.add for op in task.operators]
+        self.add.append((self.artificial_goal,))
+        self.base_costs = [op.cost for op in task.operators]
+        self.base_costs.append(0)
+        self.num_pre = [len(pre) for pre in self.pre]
+
+        num_facts = num_atoms + 2
+        precondition_of = [[] for _ in range(num_facts)]
+        achievers = [[] for _ in range(num_facts)]
+        for op_id, pre in enumerate(self.pre):
+            for atom in pre:
+                precondition_of[atom].append(op_id)
+            for atom in self.add[op_id]:
+                achievers[atom].append(op_id)
+        self.precondition_of = precondition_of
+        self.achievers = achievers
+
+        # Reusable per-evaluation arrays
+        self.h_values = [math.inf] * num_facts
+        self.status = [UNREACHED] * num_facts
+        self.costs = self.base_costs.copy()
+        self.unsatisfied = self.num_pre.copy()
+        self.supporter = [-1] * (num_ops + 1)
+        self.supporter_cost = [0] * (num_ops + 1)
+        self._inf_facts = [math.inf] * num_facts
+        self._unreached_facts = [UNREACHED] * num_facts
+        self._no_supporters = [-1] * (num_ops + 1)
+
+    def __call__(self, state):
+        return self.compute(state)
+
+    def compute(self, state):
+        """
+        Compute the LM-Cut value of a state.
+
+        Args:
+            state: Iterable of atom IDs true in the state
+
+        Returns:
+            The sum of the landmark costs, or math.inf if the goal is
+            unreachable in the delete relaxation
+        """
+        return self._compute(state, (), None)
+
+    def compute_landmarks(self, state, landmarks=()):
+        """
+        Compute the LM-Cut value of a state on top of known landmarks.
+
+        Args:
+            state: Iterable of atom IDs true in the state
+            landmarks: (cost, operator IDs) disjunctive action landmarks of
+                the state whose costs are a cost partitioning; their costs
+                are subtracted before the first cut is computed
+
+        Returns:
+            (h, landmarks) where landmarks extends the given ones by the new
+            cuts; h is math.inf (and landmarks None) for dead ends
+        """
+        found = list(landmarks)
+        h = self._compute(state, landmarks, found)
+        return h, (found if h != math.inf else None)
+
+    def _compute(self, state, landmarks, found):
+        """LM-Cut after paying `landmarks`, appending new cuts to `found`."""
+        state = list(state)
+        state.append(self.artificial_pre)
+
+        costs = self.costs
+        costs[:] = self.base_costs
+        total_h = 0
+        for cut_cost, cut in landmarks:
+            for op_id in cut:
+                costs[op_id] -= cut_cost
+            total_h += cut_cost
+        self._first_exploration(state)
+
+        h_values = self.h_values
+        artificial_goal = self.artificial_goal
+        if h_values[artificial_goal] == math.inf:
+            return math.inf
+
+        status = self.status
+        while h_values[artificial_goal] != 0:
+            self._mark_goal_plateau()
+            cut = self._find_cut(state)
+
+            # The cut is a disjunctive action landmark
+            cut_cost = min(costs[op_id] for op_id in cut)
+            for op_id in cut:
+                costs[op_id] -= cut_cost
+            total_h += cut_cost
+            if found is not None:
+                found.append((cut_cost, tuple(cut)))
+
+            self._incremental_exploration(cut)
+            status[:] = self._unreached_facts
+
+        return total_h
+
+    def _first_exploration(self, state):
+        """Generalized Dijkstra computing h^max and the h^max supporters."""
+        h_values = self.h_values
+        h_values[:] = self._inf_facts
+        unsatisfied = self.unsatisfied
+        unsatisfied[:] = self.num_pre
+        supporter = self.supporter
+        supporter[:] = self._no_supporters
+        supporter_cost = self.supporter_cost
+        precondition_of = self.precondition_of
+        add = self.add
+        costs = self.costs
+
+        queue = []
+        for atom in state:
+            h_values[atom] = 0
+            queue.append((0, atom))
+
+        while queue:
+            cost, atom = heapq.heappop(queue)
+            if cost > h_values[atom]:
+                continue  # Stale queue entry
+            for op_id in precondition_of[atom]:
+                unsatisfied[op_id] -= 1
+                if unsatisfied[op_id]:
+                    continue
+                # The last settled precondition is a most expensive one
+                supporter[op_id] = atom
+                supporter_cost[op_id] = cost
+                new_h = cost + costs[op_id]
+                for add_atom in add[op_id]:
+                    if new_h < h_values[add_atom]:
+                        h_values[add_atom] = new_h
+                        heapq.heappush(queue, (new_h, add_atom))
+
+    def _mark_goal_plateau(self):
+        """Mark all facts reaching the artificial goal at zero cost."""
+        status = self.status
+        achievers = self.achievers
+        supporter = self.supporter
+        costs = self.costs
+
+        stack = [self.artificial_goal]
+        while stack:
+            atom = stack.pop()
+            if status[atom] == GOAL_ZONE:
                 continue
-            
-            # Compute new h-value for effects
-            new_h = max_pre_h + op['cost']
-            
-            # Update h-values for add effects (delete effects ignored in relaxation)
-            for add_effect in op['add']:
-                if add_effect not in h_values:
-                    h_values[add_effect] = new_h
-                    changed = True
-                elif new_h < h_values[add_effect]:
-                    h_values[add_effect] = new_h
-                    changed = True
-    
-    return h_values
-
-def find_landmarks(init_atoms, goal_atoms, strips_ops):
+            status[atom] = GOAL_ZONE
+            for op_id in achievers[atom]:
+                if costs[op_id] == 0 and supporter[op_id] >= 0:
+                    stack.append(supporter[op_id])
+
+    def _find_cut(self, state):
+        """
+        Collect the operators leading from the part of the justification
+        graph reachable from the state into the goal zone.
+        """
+        status = self.status
+        precondition_of = self.precondition_of
+        supporter = self.supporter
+        add = self.add
+
+        for atom in state:
+            status[atom] = BEFORE_GOAL_ZONE
+        queue = list(state)
+        cut = []
+        while queue:
+            atom = queue.pop()
+            for op_id in precondition_of[atom]:
+                if supporter[op_id] != atom:
+                    continue
+                effects = add[op_id]
+                if any(status[effect] == GOAL_ZONE for effect in effects):
+                    cut.append(op_id)
+                    continue
+                for effect in effects:
+                    if status[effect] != BEFORE_GOAL_ZONE:
+                        status[effect] = BEFORE_GOAL_ZONE
+                        queue.append(effect)
+        return cut
+
+    def _incremental_exploration(self, cut):
+        """
+        Update h^max after the costs of the cut operators were reduced.
+
+        Only facts whose cost drops are re-queued, and an operator is only
+        re-evaluated when its supporter became cheaper.
+        """
+        h_values = self.h_values
+        supporter = self.supporter
+        supporter_cost = self.supporter_cost
+        precondition_of = self.precondition_of
+        pre = self.pre
+        add = self.add
+        costs = self.costs
+
+        queue = []
+        for op_id in cut:
+            new_h = h_values[supporter[op_id]] + costs[op_id]
+            for add_atom in add[op_id]:
+                if new_h < h_values[add_atom]:
+                    h_values[add_atom] = new_h
+                    queue.append((new_h, add_atom))
+        heapq.heapify(queue)
+
+        while queue:
+            cost, atom = heapq.heappop(queue)
+            if cost > h_values[atom]:
+                continue  # Stale queue entry
+            for op_id in precondition_of[atom]:
+                if supporter[op_id] != atom or supporter_cost[op_id] <= cost:
+                    continue
+                # The supporter became cheaper; pick the new most expensive one
+                best = atom
+                for precond in pre[op_id]:
+                    if h_values[precond] > h_values[best]:
+                        best = precond
+                supporter[op_id] = best
+                best_cost = h_values[best]
+                if best_cost == supporter_cost[op_id]:
+                    continue
+                supporter_cost[op_id] = best_cost
+                new_h = best_cost + costs[op_id]
+                for add_atom in add[op_id]:
+                    if new_h < h_values[add_atom]:
+                        h_values[add_atom] = new_h
+                        heapq.heappush(queue, (new_h, add_atom))
+
+class IncrementalLandmarkCut:
     """
-    Compute disjunctive action landmarks using LM-Cut technique.
+    LM-Cut evaluated from the landmarks of the parent state.
+
+    A landmark of a state s that does not contain the operator o is still
+    a landmark of the successor s[o]: a plan from s[o] preceded by o is a
+    plan from s, so it uses an operator of the landmark, and o is not one.
+    The kept landmarks still form a cost partitioning, so only the cuts
+    for the remaining operator costs are computed for the successor.
+    Values may differ from LM-Cut computed from scratch, but are admissible.
+
+    States are packed; the per-state data passed between calls is the list
+    of (cost, operator IDs) landmarks.
     """
-    if not goal_atoms:
-        return 0  # No goals, h=0
-    
-    # Total heuristic value
-    total_h = 0
-    
-    # Create copies of operators to modify their costs
-    ops_copy = copy.deepcopy(strips_ops)
-    
-    # Create artificial goal fact and goal operator
-    artificial_goal = "ARTIFICIAL-GOAL"
-    goal_op = {
-        'name': "achieve-goal",
-        'pre': goal_atoms.copy(),
-        'add': [artificial_goal],
-        'del': [],
-        'cost': 0
-    }
-    ops_copy.append(goal_op)
-    
-    # Main loop for LM-Cut
-    while True:
-        # Step 1: Compute h^max values
-        h_values = compute_hmax_values(init_atoms, goal_atoms, ops_copy, artificial_goal)
-        
-        # Check if goal is reachable
-        if artificial_goal not in h_values or h_values[artificial_goal] == math.inf:
-            break  # Goal unreachable, no more landmarks
-        
-        # Check if goal already achieved
-        if h_values[artificial_goal] == 0:
-            break  # Goal reached with zero cost
-        
-        # Step 2: Build justification graph
-        # For each fact, find operators that achieve it
-        achievers = defaultdict(list)  # atom -> list of operators
-        
-        # For each operator, find its critical parent (precondition with max h-value)
-        critical_parents = {}  # op_name -> (precond, h_value)
-        
-        for op in ops_copy:
-            if op['cost'] <= 0:
-                continue  # Skip zero-cost operators for landmarks
-            
-            # Find critical parent (precondition with highest h-value)
-            max_pre_h = -1
-            critical_pre = None
-            
-            for precond in op['pre']:
-                if precond not in h_values:
-                    continue
-                pre_h = h_values.get(precond, math.inf)
-                
-                if pre_h == math.inf:
-                    continue  # Skip unreachable preconditions
-                
-                # Use deterministic tie-breaking if h-values are equal
-                if critical_pre is None or pre_h > max_pre_h or (pre_h == max_pre_h and precond > critical_pre):
-                    max_pre_h = pre_h
-                    critical_pre = precond
-            
-            if critical_pre is not None:
-                critical_parents[op['name']] = (critical_pre, max_pre_h)
-                
-                # For each add effect, check if this operator achieves it optimally
-                for add_effect in op['add']:
-                    if add_effect not in h_values:
-                        continue
-                    
-                    add_h = h_values[add_effect]
-                    # Check if operator achieves fact with correct cost (h(add) = h(pre) + cost)
-                    if abs(add_h - (max_pre_h + op['cost'])) < 1e-6:
-                        achievers[add_effect].append((op['name'], critical_pre))
-        
-        # Step 3: Find cut
-        # Start from goal and follow justification graph backwards
-        # Build goal zone and precondition zone
-        goal_zone = {artificial_goal}
-        precondition_zone = set()
-        
-        # Add goal operator's preconditions to precondition zone
-        for precond in goal_op['pre']:
-            if h_values.get(precond, math.inf) > 0:  # Only if not in initial state
-                precondition_zone.add(precond)
-        
-        # Expand zones until fixpoint
-        while precondition_zone:
-            next_precondition_zone = set()
-            
-            for atom in precondition_zone:
-                for op_name, critical_pre in achievers.get(atom, []):
-                    if critical_pre and h_values.get(critical_pre, math.inf) > 0:
-                        if critical_pre not in goal_zone:
-                            next_precondition_zone.add(critical_pre)
-            
-            goal_zone.update(precondition_zone)
-            precondition_zone = next_precondition_zone
-        
-        # Find cut operators
-        cut_ops = []
-        
-        for atom in goal_zone:
-            for op_name, critical_pre in achievers.get(atom, []):
-                if critical_pre not in goal_zone:
-                    # Find the operator object by name
-                    for op in ops_copy:
-                        if op['name'] == op_name:
-                            cut_ops.append(op)
-                            break
-        
-        if not cut_ops:
-            break  # No valid cut found, done
-        
-        # Use minimum cost of cut operators as landmark cost
-        min_cost = min((op['cost'] for op in cut_ops), default=0)
-        
-        if min_cost <= 0:
-            break  # Zero-cost cut, we're done
-        
-        # Add landmark cost to heuristic
-        total_h += min_cost
-        
-        # Reduce costs of cut operators
-        for op in cut_ops:
-            op['cost'] -= min_cost
-    
-    return total_h
-
-def compute_lmcut(init_atoms, goal_atoms, strips_ops):
-    """Compute LM-Cut heuristic for a state."""
-    return find_landmarks(init_atoms, goal_atoms, strips_ops)
+
+    def __init__(self, task):
+        self.lmcut = LandmarkCut(task)
+        self.kept = 0  # landmarks taken over from parents
+        self.new = 0   # landmarks computed by cuts
+
+    def evaluate(self, state):
+        """Return (h, landmarks) of a packed state, computed from scratch."""
+        h, landmarks = self.lmcut.compute_landmarks(unpack_atoms(state))
+        if landmarks is not None:
+            self.new += len(landmarks)
+        return h, landmarks
+
+    def evaluate_successor(self, landmarks, op_id, state):
+        """
+        Return (h, landmarks) of the packed state reached by applying
+        operator `op_id` in the state whose landmarks are given.
+        """
+        kept = [landmark for landmark in landmarks if op_id not in landmark[1]]
+        h, new_landmarks = self.lmcut.compute_landmarks(unpack_atoms(state), kept)
+        if new_landmarks is not None:
+            self.kept += len(kept)
+            self.new += len(new_landmarks) - len(kept)
+        return h, new_landmarks
+
+    def report(self):
+        total = self.kept + self.new
+        share = self.kept / total if total else 0.0
+        return (f"Incremental LM-Cut: {self.kept} landmark(s) kept from parents, "
+                f"{self.new} computed ({share:.1%} reused)")
+
+def compute_lmcut(task, state):
+    """
+    Compute LM-Cut heuristic for a state.
+
+    This builds the per-task data on every call; create one LandmarkCut
+    and reuse it when evaluating many states.
+    """
+    return LandmarkCut(task).compute(state)
 
 def main():
     if len(sys.argv) != 2:
         print("Usage: python lmcut.py <task>.sas")
         sys.exit(1)
-    
-    # Use the new parser functions
-    vars_, domains, init_state, goal_state, ops = parse_sas(sys.argv[1])
-    init_atoms, goal_atoms, strips_ops = to_strips(domains, init_state, goal_state, ops)
-    
-    h = compute_lmcut(init_atoms, goal_atoms, strips_ops)
+
+    task = load_task_cached(sys.argv[1])
+
+    h = compute_lmcut(task, task.init)
     print(h)
 
 if __name__ == "__main__":
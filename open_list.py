@@ -0,0 +1,89 @@
+"""
+Open lists for A*, ordered by f and then by h.
+
+HeapOpenList is a binary heap of (f, h, node) tuples; ties on f and h
+go to the node created first. BucketOpenList is a two-level bucket queue
+for integer f and h values: one bucket per f value, split into one LIFO
+stack per h value. Pushing and popping do not compare tuples, and the
+last node pushed among equals is popped first, so a search tends to
+stay on the path it is currently following through the last f layer.
+
+Both take and return (f, h, node) triples, where node is a node ID.
+"""
+
+import heapq
+
+class HeapOpenList:
+    """Binary heap of (f, h, node) entries."""
+
+    def __init__(self):
+        self.heap = []
+
+    def __len__(self):
+        return len(self.heap)
+
+    def push(self, f, h, node):
+        heapq.heappush(self.heap, (f, h, node))
+
+    def pop(self):
+        return heapq.heappop(self.heap)
+
+class BucketOpenList:
+    """
+    Two-level bucket queue indexed by f and then h, LIFO within a bucket.
+
+    f and h must be non-negative integers with h <= f, which holds for
+    integer operator costs. min_f and min_h are lower bounds of the
+    smallest non-empty bucket; pop scans forward from them, so over a
+    search every bucket is skipped a bounded number of times.
+    """
+
+    def __init__(self):
+        self.buckets = []  # f -> list indexed by h of node ID stacks
+        self.size = 0
+        self.min_f = 0
+        self.min_h = 0
+
+    def __len__(self):
+        return self.size
+
+    def push(self, f, h, node):
+        buckets = self.buckets
+        while len(buckets) <= f:
+            buckets.append([])
+        layer = buckets[f]
+        while len(layer) <= h:
+            layer.append([])
+        layer[h].append(node)
+        self.size += 1
+        if f < self.min_f:
+            self.min_f = f
+            self.min_h = h
+        elif f == self.min_f and h < self.min_h:
+            self.min_h = h
+
+    def pop(self):
+        if not self.size:
+            raise IndexError("pop from an empty open list")
+        buckets = self.buckets
+        f = self.min_f
+        h = self.min_h
+        layer = buckets[f]
+        while True:
+            if h < len(layer):
+                if layer[h]:
+                    break
+                h += 1
+            else:
+                f += 1
+                h = 0
+                layer = buckets[f]
+        self.min_f = f
+        self.min_h = h
+        self.size -= 1
+        return f, h, layer[h].pop()
+
+OPEN_LISTS = {
+    'heap': HeapOpenList,
+    'bucket': BucketOpenList,
+}
@@ -0,0 +1,123 @@
+"""
+Parallel heuristic evaluation in a process pool.
+
+Every worker process builds the heuristic for the compiled task once, in
+the pool initializer, so only packed states and heuristic values cross
+process boundaries afterwards. ParallelEvaluator is used as the
+batch_heuristic_fn of planner.astar: the successors of an expansion are
+split into one chunk per worker and evaluated concurrently. The values
+are returned in the order of the states, so the expansion order and the
+plans are exactly those of sequential evaluation.
+"""
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+_worker_heuristic = None
+
+def _init_worker(task, heuristic_name):
+    global _worker_heuristic
+    from planner import make_heuristic
+    _worker_heuristic = make_heuristic(heuristic_name, task)
+
+def _ping(_):
+    return None
+
+def _evaluate_chunk(states):
+    start = time.process_time()
+    values = [_worker_heuristic(state) for state in states]
+    return values, time.process_time() - start
+
+class ParallelEvaluator:
+    """
+    Evaluate batches of packed states in a pool of worker processes.
+
+    Batches with fewer than `min_batch` states are evaluated in the main
+    process, where sending them to the pool would cost more than it saves.
+    The workers are started and their heuristics built when the evaluator
+    is created, so that startup is not charged to the first batch.
+
+    If `sample_interval` is given, every `sample_interval`-th pooled batch
+    after the first is evaluated a second time in the main process, and the
+    speedup is the sequential time of those batches divided by their
+    parallel time. Sampling costs about workers / sample_interval of extra
+    wall time, so it is off by default.
+    """
+
+    def __init__(self, task, heuristic_name, workers, min_batch=2, sample_interval=None):
+        from planner import make_heuristic
+        self.workers = workers
+        self.min_batch = min_batch
+        self.sample_interval = sample_interval
+        self.local_heuristic = make_heuristic(heuristic_name, task)
+        self.executor = ProcessPoolExecutor(workers, initializer=_init_worker,
+                                            initargs=(task, heuristic_name))
+        # One task per worker starts every process and runs its initializer
+        list(self.executor.map(_ping, range(workers)))
+        self.batches = 0
+        self.states = 0
+        self.eval_time = 0.0  # summed evaluation CPU time of all processes
+        self.wall_time = 0.0  # wall time spent waiting for evaluations
+        self.sampled_batches = 0
+        self.sampled_parallel_time = 0.0    # wall time of the sampled batches in the pool
+        self.sampled_sequential_time = 0.0  # wall time of the same batches in the main process
+
+    def __call__(self, states):
+        start = time.perf_counter()
+        if len(states) < self.min_batch:
+            cpu_start = time.process_time()
+            values = [self.local_heuristic(state) for state in states]
+            self.eval_time += time.process_time() - cpu_start
+            self.wall_time += time.perf_counter() - start
+            return values
+
+        size = -(-len(states) // self.workers)
+        chunks = [states[i:i + size] for i in range(0, len(states), size)]
+        values = []
+        for chunk_values, chunk_time in self.executor.map(_evaluate_chunk, chunks):
+            values.extend(chunk_values)
+            self.eval_time += chunk_time
+        parallel_time = time.perf_counter() - start
+        self.wall_time += parallel_time
+        if self.sample_interval and self.batches and self.batches % self.sample_interval == 0:
+            # Time the same batch sequentially to measure the speedup
+            sequential_start = time.perf_counter()
+            for state in states:
+                self.local_heuristic(state)
+            self.sampled_sequential_time += time.perf_counter() - sequential_start
+            self.sampled_parallel_time += parallel_time
+            self.sampled_batches += 1
+        self.batches += 1
+        self.states += len(states)
+        return values
+
+    @property
+    def speedup(self):
+        """Measured sequential / parallel wall time of the sampled batches."""
+        if not self.sampled_parallel_time:
+            return 1.0
+        return self.sampled_sequential_time / self.sampled_parallel_time
+
+    @property
+    def efficiency(self):
+        """Evaluation CPU time per pool wall time; an estimate of the parallelism."""
+        return self.eval_time / self.wall_time if self.wall_time else 1.0
+
+    def close(self):
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def report(self):
+        line = (f"Parallel evaluation: {self.workers} workers, {self.batches} batches, "
+                f"{self.states} states; evaluation CPU time {self.eval_time:.2f}s in "
+                f"{self.wall_time:.2f}s wall time (parallel efficiency (estimate) "
+                f"{self.efficiency:.2f})")
+        if self.sampled_batches:
+            line += (f"; measured speedup {self.speedup:.2f}x over "
+                     f"{self.sampled_batches} batch(es) timed sequentially")
+        return line
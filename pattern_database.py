@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Pattern database heuristics over the SAS variables.
+
+A pattern is a set of variables. Projecting the task onto a pattern keeps
+only the conditions and effects on those variables; every abstract state
+(an assignment to the pattern) is numbered by perfect hashing,
+sum(value * multiplier), and the cost of its cheapest abstract plan is
+stored in a flat NumPy array at that index. The distances are computed
+once by a Dijkstra search backwards from the abstract goal states.
+Evaluating a state afterwards only hashes it into every table and looks
+the distances up.
+
+Several PDBs are combined either additively or canonically. Two patterns
+are additive if no operator changes a variable of both, so their
+distances can be summed. The canonical heuristic is the maximum over the
+maximal sets of pairwise additive patterns of their sum; the additive
+combination sums one such set, chosen greedily in pattern order.
+
+Patterns are chosen automatically within a memory budget: one pattern per
+goal variable, grown by the causal-graph predecessors with the smallest
+domains while its table fits into an equal share of the budget.
+"""
+
+import sys
+import math
+import time
+import heapq
+import numpy as np
+
+DEFAULT_MAX_BYTES = 4 * 1024 * 1024
+UNREACHABLE = np.iinfo(np.int32).max  # stored distance of dead abstract states
+
+class PatternDatabase:
+    """
+    Abstract goal distances of the projection onto one pattern.
+
+    Attributes:
+        pattern: Sorted tuple of variable IDs
+        multipliers: Perfect hash multiplier of every pattern variable
+        distances: int32 array of the goal distance of every abstract state
+            (UNREACHABLE if the goal cannot be reached)
+        build_time: Seconds spent building the table
+    """
+
+    def __init__(self, task, pattern):
+        start = time.perf_counter()
+        self.pattern = tuple(sorted(pattern))
+        self.domain_sizes = [len(task.var_domains[var]) for var in self.pattern]
+        self.multipliers = []
+        num_states = 1
+        for size in self.domain_sizes:
+            self.multipliers.append(num_states)
+            num_states *= size
+        self.num_states = num_states
+        self.distances = self._compute(task)
+        self.build_time = time.perf_counter() - start
+
+    def _abstract_operators(self, task):
+        """
+        Project the operators onto the pattern.
+
+        Returns:
+            Dict mapping (conditions, effects) -> cheapest cost, both as
+            tuples of (pattern position, value). Operators without an
+            effect on the pattern only add self-loops and are left out.
+        """
+        position = {var: i for i, var in enumerate(self.pattern)}
+        abstract_ops = {}
+        for op in task.operators:
+            effects = tuple((position[var], val) for var, val in op.effects if var in position)
+            if not effects:
+                continue
+            conditions = tuple((position[var], val) for var, val in op.conditions
+                               if var in position)
+            key = (conditions, effects)
+            if op.cost < abstract_ops.get(key, math.inf):
+                abstract_ops[key] = op.cost
+        return abstract_ops
+
+    def _compute(self, task):
+        """Backward Dijkstra from the abstract goal states."""
+        indices = np.arange(self.num_states, dtype=np.int64)
+        values = [(indices // multiplier) % size
+                  for multiplier, size in zip(self.multipliers, self.domain_sizes)]
+
+        # Abstract transitions as parallel arrays, one batch per operator
+        sources, targets, costs = [], [], []
+        for (conditions, effects), cost in self._abstract_operators(task).items():
+            applicable = np.ones(self.num_states, dtype=bool)
+            for pos, val in conditions:
+                applicable &= values[pos] == val
+            source = indices[applicable]
+            target = source.copy()
+            for pos, val in effects:
+                target += (val - values[pos][applicable]) * self.multipliers[pos]
+            changed = source != target
+            sources.append(source[changed])
+            targets.append(target[changed])
+            costs.append(np.full(np.count_nonzero(changed), cost, dtype=np.int64))
+        if sources:
+            sources = np.concatenate(sources)
+            targets = np.concatenate(targets)
+            costs = np.concatenate(costs)
+        else:
+            sources = targets = costs = np.zeros(0, dtype=np.int64)
+
+        # Group the transitions by target to walk them backwards
+        order = np.argsort(targets, kind='stable')
+        bounds = np.searchsorted(targets[order], indices, side='left').tolist()
+        bounds.append(len(order))
+        predecessors = sources[order].tolist()
+        pred_costs = costs[order].tolist()
+
+        goal = np.ones(self.num_states, dtype=bool)
+        position = {var: i for i, var in enumerate(self.pattern)}
+        for var, val in task.goal:
+            if var in position:
+                goal &= values[position[var]] == val
+
+        distances = [math.inf] * self.num_states
+        queue = [(0, state) for state in np.flatnonzero(goal).tolist()]
+        for _, state in queue:
+            distances[state] = 0
+        while queue:
+            distance, state = heapq.heappop(queue)
+            if distance > distances[state]:
+                continue  # Stale queue entry
+            for i in range(bounds[state], bounds[state + 1]):
+                predecessor = predecessors[i]
+                new_distance = distance + pred_costs[i]
+                if new_distance < distances[predecessor]:
+                    distances[predecessor] = new_distance
+                    heapq.heappush(queue, (new_distance, predecessor))
+
+        return np.array([UNREACHABLE if d == math.inf else d for d in distances],
+                        dtype=np.int32)
+
+    def lookup(self, state):
+        """Return the abstract goal distance of a state (math.inf if unreachable)."""
+        index = sum(state[var] * multiplier
+                    for var, multiplier in zip(self.pattern, self.multipliers))
+        h = int(self.distances[index])
+        return math.inf if h == UNREACHABLE else h
+
+def causal_predecessors(task):
+    """
+    For every variable, the variables it depends on in the causal graph:
+    those tested or changed by an operator that changes it.
+    """
+    predecessors = [set() for _ in task.var_domains]
+    for op in task.operators:
+        involved = {var for var, _ in op.conditions}
+        involved.update(var for var, _ in op.effects)
+        for var, _ in op.effects:
+            predecessors[var].update(involved)
+    for var, preds in enumerate(predecessors):
+        preds.discard(var)
+    return predecessors
+
+def select_patterns(task, max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Choose one pattern per goal variable within a memory budget.
+
+    Every pattern starts with its goal variable and repeatedly adds the
+    causal-graph predecessor of the pattern with the smallest domain
+    (ties go to the lowest variable ID), as long as the table stays
+    within an equal share of `max_bytes`. Duplicate patterns are dropped.
+
+    Returns:
+        List of sorted tuples of variable IDs
+    """
+    domain_sizes = [len(domain) for domain in task.var_domains]
+    goal_vars = sorted({var for var, _ in task.goal})
+    if not goal_vars:
+        return []
+    max_states = max_bytes // np.dtype(np.int32).itemsize // len(goal_vars)
+    predecessors = causal_predecessors(task)
+
+    patterns = []
+    for goal_var in goal_vars:
+        if domain_sizes[goal_var] > max_states:
+            continue
+        pattern = {goal_var}
+        size = domain_sizes[goal_var]
+        while True:
+            candidates = set().union(*(predecessors[var] for var in pattern)) - pattern
+            candidates = [var for var in candidates if size * domain_sizes[var] <= max_states]
+            if not candidates:
+                break
+            var = min(candidates, key=lambda var: (domain_sizes[var], var))
+            pattern.add(var)
+            size *= domain_sizes[var]
+        pattern = tuple(sorted(pattern))
+        if pattern not in patterns:
+            patterns.append(pattern)
+    return patterns
+
+def maximal_additive_subsets(additive):
+    """
+    Return the maximal cliques of the additivity graph (Bron-Kerbosch with
+    pivoting), each as a sorted list of pattern indices.
+
+    Args:
+        additive: additive[i] is the set of patterns additive with pattern i
+    """
+    cliques = []
+
+    def expand(clique, candidates, excluded):
+        if not candidates and not excluded:
+            cliques.append(sorted(clique))
+            return
+        pivot = max(candidates | excluded, key=lambda i: len(additive[i] & candidates))
+        for i in sorted(candidates - additive[pivot]):
+            expand(clique | {i}, candidates & additive[i], excluded & additive[i])
+            candidates = candidates - {i}
+            excluded = excluded | {i}
+
+    expand(set(), set(range(len(additive))), set())
+    return sorted(cliques)
+
+class PDBHeuristic:
+    """
+    Additive or canonical combination of pattern databases over FDR states
+    (see fdr.FDRTask).
+
+    All tables are concatenated into one array. A state is evaluated with
+    one matrix product that hashes it into every table, one fancy-indexed
+    lookup, and one product with the incidence matrix of the additive
+    subsets whose row sums are maximized.
+    """
+
+    COMBINATIONS = ('canonical', 'additive')
+
+    def __init__(self, task, patterns=None, max_bytes=DEFAULT_MAX_BYTES,
+                 combination='canonical'):
+        if combination not in self.COMBINATIONS:
+            raise ValueError(f"PDB combination '{combination}' not supported.")
+        start = time.perf_counter()
+        self.combination = combination
+        if patterns is None:
+            patterns = select_patterns(task, max_bytes)
+        self.pdbs = [PatternDatabase(task, pattern) for pattern in patterns]
+
+        num_vars = len(task.var_domains)
+        self.hash_matrix = np.zeros((len(self.pdbs), num_vars), dtype=np.int64)
+        offsets = []
+        offset = 0
+        for i, pdb in enumerate(self.pdbs):
+            self.hash_matrix[i, list(pdb.pattern)] = pdb.multipliers
+            offsets.append(offset)
+            offset += pdb.num_states
+        self.offsets = np.array(offsets, dtype=np.int64)
+        self.table = (np.concatenate([pdb.distances for pdb in self.pdbs]) if self.pdbs
+                      else np.zeros(0, dtype=np.int32))
+
+        affected = [set() for _ in self.pdbs]
+        for op in task.operators:
+            changed = {var for var, _ in op.effects}
+            for i, pdb in enumerate(self.pdbs):
+                if changed.intersection(pdb.pattern):
+                    affected[i].add(op.index)
+        additive = [{j for j in range(len(self.pdbs)) if j != i and not affected[i] & affected[j]}
+                    for i in range(len(self.pdbs))]
+        if combination == 'canonical':
+            subsets = maximal_additive_subsets(additive) if self.pdbs else []
+        else:
+            chosen = []
+            for i in range(len(self.pdbs)):
+                if all(j in additive[i] for j in chosen):
+                    chosen.append(i)
+            subsets = [chosen]
+        self.subsets = subsets
+        self.subset_matrix = np.zeros((max(len(subsets), 1), len(self.pdbs)), dtype=np.int64)
+        for row, subset in enumerate(subsets):
+            self.subset_matrix[row, subset] = 1
+        self.byte_states = isinstance(task.init, bytes)
+        self.build_time = time.perf_counter() - start
+
+    def __call__(self, state):
+        values = (np.frombuffer(state, dtype=np.uint8) if self.byte_states
+                  else np.asarray(state, dtype=np.int64))
+        h_values = self.table[self.offsets + self.hash_matrix @ values]
+        if (h_values == UNREACHABLE).any():
+            return math.inf
+        return int((self.subset_matrix @ h_values).max())
+
+    @property
+    def memory(self):
+        return self.table.nbytes
+
+    def report(self):
+        sizes = ', '.join(str(pdb.num_states) for pdb in self.pdbs)
+        return (f"PDB heuristic: {len(self.pdbs)} pattern(s) [{sizes} abstract states], "
+                f"{self.memory / 1024:.1f} KiB, {len(self.subsets)} additive subset(s) "
+                f"({self.combination}), built in {self.build_time:.3f}s")
+
+def main():
+    if len(sys.argv) != 2:
+        print("Usage: python pattern_database.py <task>.sas")
+        sys.exit(1)
+
+    from fdr import load_fdr_task
+    task = load_fdr_task(sys.argv[1])
+
+    heuristic = PDBHeuristic(task)
+    print(heuristic.report())
+    print(heuristic(task.initial_state()))
+
+if __name__ == "__main__":
+    main()
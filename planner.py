@@ -4,182 +4,832 @@ Optimal A* planner using either hmax or lmcut as an admissible heuristic.
 """
 
 import sys
-import heapq
+import argparse
 import math
-from sas_parser import parse_sas, to_strips
+import time
+from array import array
+from collections import OrderedDict
+from sas_parser import load_task, unpack_atoms
+from task_cache import load_task_cached
+from simplify import simplify_task
+from search_statistics import SearchStatistics, profile_call
+from successor_generator import SuccessorGenerator, SUCCESSOR_GENERATORS
+from open_list import HeapOpenList, OPEN_LISTS
+from stubborn_sets import StubbornSetSuccessorGenerator
 
-def get_applicable(state, strips_ops):
+def apply_operator(state, op):
     """
-    Return operators applicable in the current state.
+    Apply an operator to a state, returning a new state.
     
     Args:
-        state: Set of atoms true in the current state
-        strips_ops: List of STRIPS operators
+        state: Packed state (int bitmask over atom IDs)
+        op: Compiled operator to apply
         
     Returns:
-        List of applicable operators
-    """
-    applicable = []
-    for op in strips_ops:
-        # An operator is applicable if all preconditions are satisfied
-        if all(precond in state for precond in op['pre']):
-            applicable.append(op)
-    return applicable
+        New packed state after applying the operator
+    """
+    return (state & op.keep_mask) | op.add_mask
 
-def apply_operator(state, op):
+def check_goal(state, goal_mask):
     """
-    Apply an operator to a state, returning a new state.
+    Check if the state satisfies all goal conditions.
     
     Args:
-        state: Set of atoms true in the current state
-        op: STRIPS operator to apply
+        state: Packed state (int bitmask over atom IDs)
+        goal_mask: Packed goal atoms
         
     Returns:
-        New state after applying the operator
+        True if the state satisfies the goal, False otherwise
     """
-    # Create a copy of the current state
-    new_state = state.copy()
+    return state & goal_mask == goal_mask
+
+class HeuristicCache:
+    """
+    Bounded LRU cache of heuristic values keyed on the packed state.
+    
+    A state reached again by a cheaper path keeps its heuristic value, so
+    reopened states are served from the cache instead of being evaluated
+    again. The cache is bounded by a number of entries and/or an estimate
+    of the bytes it holds; the least recently used entries are evicted first.
+    """
+    
+    # Estimated per-entry overhead of the OrderedDict (links, hash slot, h)
+    ENTRY_OVERHEAD = 100
+    
+    def __init__(self, heuristic_fn, max_entries=None, max_bytes=None, batch_fn=None):
+        self.heuristic_fn = heuristic_fn
+        self.batch_fn = batch_fn
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
     
-    # Remove deleted atoms
-    for atom in op['del']:
-        if atom in new_state:
-            new_state.remove(atom)
+    def __call__(self, state):
+        entries = self.entries
+        h = entries.get(state)
+        if h is not None:
+            self.hits += 1
+            entries.move_to_end(state)
+            return h
+        self.misses += 1
+        h = self.heuristic_fn(state)
+        self._store(state, h)
+        return h
     
-    # Add new atoms
-    for atom in op['add']:
-        new_state.add(atom)
+    def batch(self, states):
+        """
+        Look up a list of states, evaluating all misses with one call of
+        batch_fn (or one heuristic_fn call each if there is none).
+        """
+        entries = self.entries
+        values = []
+        missing = []
+        for i, state in enumerate(states):
+            h = entries.get(state)
+            if h is None:
+                missing.append(i)
+            else:
+                entries.move_to_end(state)
+            values.append(h)
+        self.hits += len(states) - len(missing)
+        self.misses += len(missing)
+        if missing:
+            missing_states = [states[i] for i in missing]
+            if self.batch_fn is not None:
+                missing_values = self.batch_fn(missing_states)
+            else:
+                missing_values = [self.heuristic_fn(state) for state in missing_states]
+            for i, state, h in zip(missing, missing_states, missing_values):
+                values[i] = h
+                self._store(state, h)
+        return values
     
-    return new_state
+    def _store(self, state, h):
+        entries = self.entries
+        entries[state] = h
+        self.bytes += sys.getsizeof(state) + self.ENTRY_OVERHEAD
+        while ((self.max_entries is not None and len(entries) > self.max_entries)
+               or (self.max_bytes is not None and self.bytes > self.max_bytes)):
+            old_state, _ = entries.popitem(last=False)
+            self.bytes -= sys.getsizeof(old_state) + self.ENTRY_OVERHEAD
+            self.evictions += 1
+    
+    def report(self):
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups if lookups else 0.0
+        return (f"Heuristic cache: {self.hits} hits, {self.misses} misses "
+                f"({rate:.1%} hit rate), {self.evictions} evictions, "
+                f"{len(self.entries)} entries (~{self.bytes / 1024:.1f} KiB)")
 
-def check_goal(state, goal_atoms):
+def make_heuristic(name, task):
     """
-    Check if the state satisfies all goal conditions.
+    Build the heuristic function `name` ('hmax' or 'lmcut') for a task.
     
-    Args:
-        state: Set of atoms true in the current state
-        goal_atoms: List of atoms that must be true in the goal
-        
-    Returns:
-        True if the state satisfies the goal, False otherwise
+    The returned function takes a packed state.
     """
-    return all(atom in state for atom in goal_atoms)
+    if name == "hmax":
+        from hmax import compute_hmax
+        return lambda state: compute_hmax(task, unpack_atoms(state))
+    if name == "lmcut":
+        from lmcut import LandmarkCut
+        lmcut = LandmarkCut(task)
+        return lambda state: lmcut(unpack_atoms(state))
+    raise ValueError(f"Heuristic '{name}' not supported.")
 
-def state_to_frozenset(state):
+# Queued states whose incremental heuristic data astar keeps by default; the
+# h^max tables of a state take about 9 KiB on elevators01
+DEFAULT_INCREMENTAL_LIMIT = 20000
+
+def make_incremental_heuristic(name, task):
+    """
+    Build the incremental heuristic `name` for a task (see astar's
+    `incremental` argument).
+    """
+    if name == "hmax":
+        from hmax import IncrementalHmax
+        return IncrementalHmax(task)
+    if name == "lmcut":
+        from lmcut import IncrementalLandmarkCut
+        return IncrementalLandmarkCut(task)
+    raise ValueError(f"Incremental heuristic '{name}' not supported.")
+
+class SearchSpace:
     """
-    Convert a state (set of atoms) to a frozenset for hashing.
+    Search nodes stored as compact parallel arrays indexed by node ID.
     
-    Args:
-        state: Set of atoms
-        
-    Returns:
-        Frozenset representation of the state
+    Every node records its packed state, the ID of its parent node, the ID
+    of the operator that created it and its g value. Plans are only rebuilt
+    by following parent pointers once a goal is found.
     """
-    return frozenset(state)
+    
+    def __init__(self):
+        self.states = []
+        self.parents = array('i')
+        self.creating_ops = array('i')
+        self.g = array('q')
+        self.closed = bytearray()  # 1 while a node is expanded and not reopened
+        self.node_of = {}  # packed state -> node ID
+    
+    def __len__(self):
+        return len(self.states)
+    
+    def add(self, state, parent, op_id, g):
+        """Create a node for a state not seen before and return its ID."""
+        node = len(self.states)
+        self.states.append(state)
+        self.parents.append(parent)
+        self.creating_ops.append(op_id)
+        self.g.append(g)
+        self.closed.append(0)
+        self.node_of[state] = node
+        return node
+    
+    def update(self, node, parent, op_id, g):
+        """Redirect a node to a cheaper path."""
+        self.parents[node] = parent
+        self.creating_ops[node] = op_id
+        self.g[node] = g
+    
+    def extract_plan(self, node):
+        """Return the operator IDs on the path from the root to a node."""
+        plan = []
+        while self.parents[node] >= 0:
+            plan.append(self.creating_ops[node])
+            node = self.parents[node]
+        plan.reverse()
+        return plan
 
-def astar(initial_state, goal_atoms, strips_ops, heuristic_fn):
+def astar(task, heuristic_fn, successor_generator=None, batch_heuristic_fn=None,
+          statistics=None, open_list=None, incremental=None, max_node_data=None,
+          apply_fn=None, goal_fn=None):
     """
     A* search algorithm.
     
     Args:
-        initial_state: Set of atoms true in the initial state
-        goal_atoms: List of atoms that must be true in the goal
-        strips_ops: List of STRIPS operators
-        heuristic_fn: Function that takes a state and returns a heuristic value
+        task: Compiled Task (see sas_parser.compile_task)
+        heuristic_fn: Function that takes a packed state and returns a heuristic value
+        successor_generator: Object whose get_applicable(state) returns the
+            applicable operators (default: a decision-tree SuccessorGenerator)
+        batch_heuristic_fn: Optional function that takes a list of packed
+            states and returns their heuristic values. If given, the new
+            successors of every expansion are evaluated with one call.
+        statistics: Optional SearchStatistics to fill in; phase timers, open
+            list samples and f-layer progress are only recorded if it was
+            created with detailed=True
+        open_list: Optional empty open list (see open_list.py, default: a
+            HeapOpenList)
+        incremental: Optional incremental heuristic used instead of
+            heuristic_fn. Its evaluate(state) and evaluate_successor(data,
+            op_id, state) both return (h, data); the data of a queued node
+            is kept until the node is expanded, and its successors are
+            evaluated from it.
+        max_node_data: Keep the incremental data of at most this many
+            queued nodes; the data of the others is recomputed from scratch
+            when they are expanded
+        apply_fn: Optional function that takes a state and an applicable
+            operator and returns the successor state, or None to prune it
+            (counted in statistics.pruned). Together with goal_fn this lets
+            A* search other state representations, e.g. fdr.FDRTask
+            (default: apply_operator on packed states)
+        goal_fn: Optional function that takes a state and returns whether
+            it is a goal state (default: check_goal with task.goal_mask)
         
     Returns:
         (plan, cost) tuple where plan is a list of operator names or None if no plan exists
     """
-    # Create initial state as a set for efficient membership testing
-    initial_state_set = set(initial_state)
+    if successor_generator is None:
+        successor_generator = SuccessorGenerator(task)
+    if statistics is None:
+        statistics = SearchStatistics()
+    if open_list is None:
+        open_list = HeapOpenList()
+    if apply_fn is None:
+        apply_fn = apply_operator
+    if goal_fn is None:
+        goal_mask = task.goal_mask
+        goal_fn = lambda state: check_goal(state, goal_mask)
+    push = open_list.push
+    pop = open_list.pop
+    detailed = statistics.detailed
+    clock = time.perf_counter
+    phase_times = statistics.phase_times
+    
+    # States are packed into ints (or other hashables), hashable for the closed list
+    initial_state = task.initial_state()
     
     # Calculate initial heuristic value
-    initial_h = heuristic_fn(initial_state_set)
+    statistics.evaluated += 1
+    if incremental is not None:
+        initial_h, initial_data = incremental.evaluate(initial_state)
+    else:
+        initial_h = heuristic_fn(initial_state)
     if initial_h == math.inf:
+        statistics.dead_ends += 1
         return None, math.inf  # Goal unreachable from start
     
-    # Initialize open list with (f, g, state, plan) tuples
-    # f = g + h is the total estimated cost
-    initial_state_frozen = state_to_frozenset(initial_state_set)
-    open_list = [(initial_h, 0, initial_state_frozen, [])]
-    heapq.heapify(open_list)
-    
-    # closed[state_frozen] = g value (cost so far)
-    closed = {initial_state_frozen: 0}
+    space = SearchSpace()
+    node_of = space.node_of
+    g_values = space.g
+    closed = space.closed
+    root = space.add(initial_state, -1, -1, 0)
+    node_data = {}  # node ID -> incremental heuristic data of queued nodes
+    if incremental is not None:
+        node_data[root] = initial_data
     
-    expanded = 0  # Count expanded nodes
+    # Initialize open list with (f, h, node) entries
+    # f = g + h is the total estimated cost, ties are broken by lower h
+    push(initial_h, initial_h, root)
+    f_layer = -1
     
     while open_list:
-        f, g, current_state_frozen, plan = heapq.heappop(open_list)
-        expanded += 1
-        
-        # Convert back to set for operations
-        current_state = set(current_state_frozen)
+        if detailed:
+            start = clock()
+            f, h, node = pop()
+            phase_times['open_list'] += clock() - start
+        else:
+            f, h, node = pop()
+        g = g_values[node]
         
         # Skip if we've found a better path to this state already
-        if g > closed.get(current_state_frozen, math.inf):
+        if g + h < f:
             continue
+        if detailed:
+            if f > f_layer:
+                f_layer = f
+                statistics.new_f_layer(f)
+        statistics.expanded += 1
+        if detailed and statistics.expanded % statistics.sample_interval == 0:
+            statistics.sample_open_list(len(open_list))
+        closed[node] = 1
+        
+        current_state = space.states[node]
         
         # Check if we've reached the goal
-        if check_goal(current_state, goal_atoms):
-            return plan, g
+        if goal_fn(current_state):
+            plan = space.extract_plan(node)
+            return [task.operators[op_id].name for op_id in plan], g
         
         # Find applicable operators
-        applicable_ops = get_applicable(current_state, strips_ops)
+        if detailed:
+            start = clock()
+        applicable_ops = successor_generator.get_applicable(current_state)
+        statistics.generated += len(applicable_ops)
+        if detailed:
+            phase_times['successors'] += clock() - start
+            start = clock()
         
-        # Apply each operator and add resulting states to open list
+        # Apply each operator and collect the successors reached more cheaply
+        successors = []
         for op in applicable_ops:
-            next_state = apply_operator(current_state, op)
-            next_state_frozen = state_to_frozenset(next_state)
+            next_state = apply_fn(current_state, op)
+            if next_state is None:
+                statistics.pruned += 1
+                continue
             
             # Calculate new cost
-            new_g = g + op['cost']
+            new_g = g + op.cost
             
             # Only expand if we found a better path
-            if new_g < closed.get(next_state_frozen, math.inf):
-                closed[next_state_frozen] = new_g
-                
-                # Calculate heuristic for new state
-                h = heuristic_fn(next_state)
-                if h == math.inf:
-                    continue  # Skip states from which goal is unreachable
-                
-                # Update open list
-                f_new = new_g + h
-                new_plan = plan + [op['name']]
-                heapq.heappush(open_list, (f_new, new_g, next_state_frozen, new_plan))
+            next_node = node_of.get(next_state)
+            if next_node is None:
+                next_node = space.add(next_state, node, op.index, new_g)
+            elif new_g < g_values[next_node]:
+                space.update(next_node, node, op.index, new_g)
+                if closed[next_node]:
+                    closed[next_node] = 0
+                    statistics.reopened += 1
+            else:
+                continue
+            successors.append((next_node, new_g, next_state, op.index))
+        
+        # Calculate heuristic for the new states
+        if detailed:
+            phase_times['apply'] += clock() - start
+            start = clock()
+        statistics.evaluated += len(successors)
+        if incremental is not None:
+            parent_data = node_data.pop(node, None)
+            if parent_data is None:
+                _, parent_data = incremental.evaluate(current_state)
+            h_values = []
+            for next_node, _, next_state, op_id in successors:
+                next_h, next_data = incremental.evaluate_successor(parent_data, op_id, next_state)
+                h_values.append(next_h)
+                if max_node_data is None or len(node_data) < max_node_data:
+                    node_data[next_node] = next_data
+                else:
+                    node_data.pop(next_node, None)  # Stale data of a reopened node
+        elif batch_heuristic_fn is not None:
+            h_values = batch_heuristic_fn([state for _, _, state, _ in successors])
+        else:
+            h_values = [heuristic_fn(state) for _, _, state, _ in successors]
+        if detailed:
+            phase_times['heuristic'] += clock() - start
+            start = clock()
+        
+        # Add them to the open list
+        for (next_node, new_g, _, _), next_h in zip(successors, h_values):
+            if next_h == math.inf:
+                statistics.dead_ends += 1
+                node_data.pop(next_node, None)
+                continue  # Skip states from which goal is unreachable
+            push(new_g + next_h, next_h, next_node)
+        if detailed:
+            phase_times['open_list'] += clock() - start
     
     # If we exit the loop without finding a plan, no plan exists
     return None, math.inf
 
-def main():
-    if len(sys.argv) != 3:  # planner.py <task>.sas {hmax|lmcut}
-        print("Usage: python planner.py <task>.sas {hmax|lmcut}")
-        sys.exit(1)
+def lazy_astar(task, heuristic_fn, successor_generator=None, ordering_fn=None,
+               statistics=None, open_list=None):
+    """
+    A* search with deferred heuristic evaluation.
     
-    sasfile, heu_name = sys.argv[1], sys.argv[2]
+    Successors are pushed with an admissible placeholder instead of their
+    heuristic value: h(parent) - cost(op), which cannot exceed h*(successor)
+    because h(parent) <= h*(parent). heuristic_fn is only called when a
+    node is popped; if its real f value is higher than the one it was
+    queued with, the node is pushed back instead of being expanded. Nodes
+    that are never popped are never evaluated.
     
-    if heu_name not in ("hmax", "lmcut"):
-        print("Heuristic must be 'hmax' or 'lmcut'")
-        sys.exit(1)
+    Args:
+        task: Compiled Task (see sas_parser.compile_task)
+        heuristic_fn: Function that takes a packed state and returns a heuristic value
+        successor_generator: Object whose get_applicable(state) returns the
+            applicable operators (default: a decision-tree SuccessorGenerator)
+        ordering_fn: Optional cheap admissible heuristic (e.g. h^max for an
+            LM-Cut search) evaluated for every new successor. The placeholder
+            is the maximum of both bounds, and states it proves to be dead
+            ends are never queued.
+        statistics: Optional SearchStatistics to fill in
+        open_list: Optional empty open list (see open_list.py, default: a
+            HeapOpenList)
+        
+    Returns:
+        (plan, cost) tuple where plan is a list of operator names or None if no plan exists
+    """
+    if successor_generator is None:
+        successor_generator = SuccessorGenerator(task)
+    if statistics is None:
+        statistics = SearchStatistics()
+    if open_list is None:
+        open_list = HeapOpenList()
+    push = open_list.push
+    pop = open_list.pop
+    detailed = statistics.detailed
+    clock = time.perf_counter
+    phase_times = statistics.phase_times
     
-    # Parse SAS file and convert to STRIPS
-    vars_, domains, init_state, goal_state, ops = parse_sas(sasfile)
-    init_atoms, goal_atoms, strips_ops = to_strips(domains, init_state, goal_state, ops)
+    initial_state = task.initial_state()
+    goal_mask = task.goal_mask
     
-    # Define the heuristic function based on user input
-    if heu_name == "hmax":
-        from hmax import compute_hmax
-        heuristic = lambda state: compute_hmax(state, goal_atoms, strips_ops)
-    elif heu_name == "lmcut":
-        from lmcut import compute_lmcut
-        heuristic = lambda state: compute_lmcut(state, goal_atoms, strips_ops)
+    statistics.evaluated += 1
+    initial_h = heuristic_fn(initial_state)
+    if initial_h == math.inf:
+        statistics.dead_ends += 1
+        return None, math.inf
+    
+    space = SearchSpace()
+    node_of = space.node_of
+    g_values = space.g
+    closed = space.closed
+    root = space.add(initial_state, -1, -1, 0)
+    true_h = {root: initial_h}  # node ID -> evaluated heuristic value
+    
+    # Open list entries are (f, h, node) where h may be a placeholder
+    push(initial_h, initial_h, root)
+    f_layer = -1
+    
+    while open_list:
+        if detailed:
+            start = clock()
+            f, h, node = pop()
+            phase_times['open_list'] += clock() - start
+        else:
+            f, h, node = pop()
+        g = g_values[node]
+        
+        # Skip if we've found a better path to this state already
+        if g + h < f:
+            continue
+        
+        current_state = space.states[node]
+        
+        # Goal states have h* = 0, so their placeholder f is exact
+        if check_goal(current_state, goal_mask):
+            plan = space.extract_plan(node)
+            return [task.operators[op_id].name for op_id in plan], g
+        
+        # Evaluate the node now that it is about to be expanded
+        node_h = true_h.get(node)
+        if node_h is None:
+            if detailed:
+                start = clock()
+            statistics.evaluated += 1
+            node_h = true_h[node] = heuristic_fn(current_state)
+            if detailed:
+                phase_times['heuristic'] += clock() - start
+            if node_h == math.inf:
+                statistics.dead_ends += 1
+                continue
+        if node_h > h:
+            statistics.reinserted += 1
+            push(g + node_h, node_h, node)
+            continue
+        
+        if detailed:
+            if f > f_layer:
+                f_layer = f
+                statistics.new_f_layer(f)
+        statistics.expanded += 1
+        if detailed and statistics.expanded % statistics.sample_interval == 0:
+            statistics.sample_open_list(len(open_list))
+        closed[node] = 1
+        
+        # Find applicable operators
+        if detailed:
+            start = clock()
+        applicable_ops = successor_generator.get_applicable(current_state)
+        statistics.generated += len(applicable_ops)
+        if detailed:
+            phase_times['successors'] += clock() - start
+            start = clock()
+        
+        # Apply each operator and collect the successors reached more cheaply
+        successors = []
+        for op in applicable_ops:
+            next_state = (current_state & op.keep_mask) | op.add_mask
+            new_g = g + op.cost
+            
+            next_node = node_of.get(next_state)
+            if next_node is None:
+                next_node = space.add(next_state, node, op.index, new_g)
+            elif new_g < g_values[next_node]:
+                space.update(next_node, node, op.index, new_g)
+                if closed[next_node]:
+                    closed[next_node] = 0
+                    statistics.reopened += 1
+            else:
+                continue
+            successors.append((next_node, new_g, next_state, node_h - op.cost))
+        
+        if detailed:
+            phase_times['apply'] += clock() - start
+            start = clock()
+        
+        # Queue them with their known value or an admissible placeholder
+        queued = []
+        for next_node, new_g, next_state, placeholder in successors:
+            next_h = true_h.get(next_node)
+            if next_h is None:
+                next_h = max(placeholder, 0)
+                if ordering_fn is not None:
+                    statistics.cheap_evaluated += 1
+                    next_h = max(next_h, ordering_fn(next_state))
+            if next_h == math.inf:
+                statistics.dead_ends += 1
+                continue
+            queued.append((new_g + next_h, next_h, next_node))
+        if detailed:
+            phase_times['heuristic'] += clock() - start
+            start = clock()
+        
+        for entry in queued:
+            push(*entry)
+        if detailed:
+            phase_times['open_list'] += clock() - start
+    
+    return None, math.inf
+
+def search_fdr(args, task):
+    """Run the FDR search of main() on the compiled STRIPS task of the input."""
+    from fdr import load_fdr_task, FDRSuccessorGenerator
+    
+    fdr_task = load_fdr_task(args.input)
+    print(fdr_task.report())
+    
+    pdbs = None
+    if args.heuristic == "pdb":
+        from pattern_database import PDBHeuristic
+        pdbs = heuristic = PDBHeuristic(fdr_task, max_bytes=int(args.pdb_memory * 1024 * 1024),
+                                        combination=args.pdb_combination)
+        print(pdbs.report())
+    else:
+        # The search reaches states in which atoms are true that the STRIPS
+        # initial state lacks, so the heuristic needs the unsimplified task
+        pack = fdr_task.strips_packer(task)
+        strips_heuristic = make_heuristic(args.heuristic, task)
+        heuristic = lambda state: strips_heuristic(pack(state))
+    cache = None
+    if args.cache_size > 0:
+        cache = heuristic = HeuristicCache(heuristic, args.cache_size, args.cache_bytes)
+    successor_generator = FDRSuccessorGenerator(fdr_task)
+    print(successor_generator.report())
+    
+    statistics = SearchStatistics(detailed=args.stats)
+    search_args = (astar, fdr_task, heuristic, successor_generator, None, statistics,
+                   OPEN_LISTS[args.open_list](), None, None, fdr_task.apply, fdr_task.is_goal)
+    if args.profile:
+        plan, cost = profile_call(args.profile, *search_args)
+    else:
+        search, *search_args = search_args
+        plan, cost = search(*search_args)
+    
+    print(statistics.report())
+    if cache is not None:
+        print(cache.report())
+    if plan is None:
+        print("No plan found")
+    else:
+        for op_name in plan:
+            print(op_name)
+        print(f"Plan cost: {cost}")
+
+def search_hdastar(args, task):
+    """Run the HDA* search of main(); the workers build their own heuristics."""
+    from hdastar import HDAStar
+    
+    statistics = SearchStatistics()
+    hda = HDAStar(task, args.heuristic, args.workers, args.successor_generator, statistics)
+    if args.profile:
+        plan, cost = profile_call(args.profile, hda.run)
+    else:
+        plan, cost = hda.run()
+    
+    print(statistics.report())
+    print(hda.report())
+    if plan is None:
+        print("No plan found")
+    else:
+        for op_name in plan:
+            print(op_name)
+        print(f"Plan cost: {cost}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Optimal A* planner for SAS tasks')
+    parser.add_argument('input', help='Input .sas file')
+    parser.add_argument('heuristic', choices=('hmax', 'lmcut', 'pdb'),
+                        help='pdb requires --representation fdr')
+    parser.add_argument('--successor-generator', choices=sorted(SUCCESSOR_GENERATORS),
+                        default='tree', help='How to find applicable operators (default: tree)')
+    parser.add_argument('--anytime', action='store_true',
+                        help='Restarting weighted A*: print a plan quickly, then cheaper ones '
+                             'until the best is proven optimal')
+    parser.add_argument('--weights', default='inf,5,3,2,1.5,1',
+                        help='Comma-separated weights of the anytime runs, ending in 1; inf is '
+                             'greedy best-first search (default: inf,5,3,2,1.5,1)')
+    parser.add_argument('--time-limit', type=float, default=None,
+                        help='Stop the anytime search after this many seconds')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Evaluate successors incrementally from their parent '
+                             '(hmax: repair the parent\'s cost table, lmcut: reuse the '
+                             'parent\'s landmarks)')
+    parser.add_argument('--incremental-limit', type=int, default=None,
+                        help='Keep the incremental heuristic data of at most N queued states; '
+                             'the rest is recomputed on expansion (default: '
+                             f'{DEFAULT_INCREMENTAL_LIMIT})')
+    parser.add_argument('--open-list', choices=sorted(OPEN_LISTS), default='heap',
+                        help='Open list of astar; bucket requires integer costs and h values '
+                             '(default: heap)')
+    parser.add_argument('--search', choices=('astar', 'idastar', 'hdastar'), default='astar',
+                        help='Search algorithm; idastar only keeps the current path and the '
+                             'transposition table in memory, hdastar distributes the states '
+                             'over --workers search processes (default: astar)')
+    parser.add_argument('--tt-size', type=int, default=0,
+                        help='Number of transposition table slots for idastar, 0 disables the '
+                             'table (default: 0)')
+    parser.add_argument('--representation', choices=('strips', 'fdr'), default='strips',
+                        help='Search on STRIPS atoms or directly on the SAS variables, pruning '
+                             'with the mutex groups; heuristics are computed on the unsimplified '
+                             'STRIPS task (default: strips)')
+    parser.add_argument('--pdb-memory', type=float, default=4,
+                        help='Memory budget of the automatically selected pattern databases '
+                             'in MiB (default: 4)')
+    parser.add_argument('--pdb-combination', choices=('canonical', 'additive'),
+                        default='canonical',
+                        help='Maximize over all maximal additive subsets of the pattern '
+                             'databases, or sum one of them (default: canonical)')
+    parser.add_argument('--pruning', choices=('none', 'stubborn'), default='none',
+                        help='Only expand the applicable operators of a strong stubborn set '
+                             '(default: none)')
+    parser.add_argument('--cache-size', type=int, default=None,
+                        help='Maximum number of cached heuristic values, 0 disables the cache '
+                             '(default: 1000000 for astar, 0 for idastar)')
+    parser.add_argument('--cache-bytes', type=int, default=None,
+                        help='Maximum estimated size of the heuristic cache in bytes')
+    parser.add_argument('--batch', action='store_true',
+                        help='Evaluate the successors of each expansion as one batch with the '
+                             'vectorized NumPy h^max (hmax only)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Evaluate successors in a pool of N worker processes, or search '
+                             'with N processes with --search hdastar (default: 1)')
+    parser.add_argument('--speedup-sample', type=int, default=None, metavar='N',
+                        help='With --workers, also evaluate every N-th batch sequentially to '
+                             'measure the speedup of the pool (default: off)')
+    parser.add_argument('--no-task-cache', action='store_true',
+                        help='Always parse the .sas file instead of using the compiled task cache')
+    parser.add_argument('--lazy', action='store_true',
+                        help='Defer heuristic evaluation until a state is expanded')
+    parser.add_argument('--ordering', choices=('hmax',),
+                        help='Order the open list of a lazy search with this cheap heuristic '
+                             '(requires --lazy)')
+    parser.add_argument('--no-simplify', action='store_true',
+                        help='Search the task as parsed, without removing unreachable, '
+                             'irrelevant and duplicate operators')
+    parser.add_argument('--stats', action='store_true',
+                        help='Report per-phase timers, open list sizes and f-layer progress')
+    parser.add_argument('--profile', metavar='FILE',
+                        help='Run the search under cProfile and dump the profile to FILE')
+    args = parser.parse_args()
+    
+    if args.batch and args.heuristic != "hmax":
+        parser.error("--batch is only supported with the hmax heuristic")
+    if args.batch and args.workers > 1:
+        parser.error("--batch and --workers are mutually exclusive")
+    if args.speedup_sample is not None and (args.workers < 2 or args.search != "astar"):
+        parser.error("--speedup-sample requires --workers with --search astar")
+    if args.lazy and (args.batch or args.workers > 1):
+        parser.error("--lazy evaluates one state at a time and cannot use --batch or --workers")
+    if args.ordering and not args.lazy:
+        parser.error("--ordering requires --lazy")
+    if args.search == "idastar" and (args.lazy or args.batch or args.workers > 1):
+        parser.error("idastar cannot be combined with --lazy, --batch or --workers")
+    if args.search == "hdastar" and (args.lazy or args.batch or args.anytime or args.incremental
+                                     or args.pruning != "none"
+                                     or args.representation != "strips"):
+        parser.error("hdastar cannot be combined with --lazy, --batch, --anytime, "
+                     "--incremental, --pruning or --representation fdr")
+    if args.open_list != "heap" and args.search != "astar":
+        parser.error("--open-list only applies to --search astar")
+    if args.tt_size and args.search != "idastar":
+        parser.error("--tt-size requires --search idastar")
+    if args.anytime and (args.search != "astar" or args.lazy or args.batch or args.workers > 1
+                         or args.open_list != "heap"):
+        parser.error("--anytime cannot be combined with --search idastar, --lazy, --batch, "
+                     "--workers or --open-list")
+    if args.time_limit is not None and not args.anytime:
+        parser.error("--time-limit requires --anytime")
+    try:
+        weights = tuple(float(w) for w in args.weights.split(','))
+    except ValueError:
+        parser.error(f"invalid --weights: {args.weights}")
+    if weights[-1] != 1 or any(w < 1 for w in weights):
+        parser.error("--weights must be at least 1 and end in 1")
+    if args.incremental_limit is not None and not args.incremental:
+        parser.error("--incremental-limit requires --incremental")
+    if args.incremental and (args.search != "astar" or args.lazy or args.anytime or args.batch
+                             or args.workers > 1):
+        parser.error("--incremental cannot be combined with --search idastar, --lazy, "
+                     "--anytime, --batch or --workers")
+    if args.representation == "fdr" and (
+            args.search != "astar" or args.lazy or args.anytime or args.incremental
+            or args.batch or args.workers > 1 or args.pruning != "none"
+            or args.successor_generator != "tree"):
+        parser.error("--representation fdr only supports plain A* without --lazy, --anytime, "
+                     "--incremental, --batch, --workers, --pruning or --successor-generator")
+    if args.heuristic == "pdb" and args.representation != "fdr":
+        parser.error("the pdb heuristic requires --representation fdr")
+    if args.cache_size is None:
+        # IDA* is bounded by its transposition table, and incremental
+        # evaluation depends on the parent, so neither uses the cache
+        args.cache_size = 0 if args.search == "idastar" or args.incremental else 1000000
+    if args.incremental_limit is None:
+        args.incremental_limit = DEFAULT_INCREMENTAL_LIMIT
+    
+    # Parse SAS file and compile it to an integer STRIPS task
+    if args.no_task_cache:
+        task = load_task(args.input)
     else:
-        print(f"Heuristic '{heu_name}' not supported.")
-        sys.exit(1)
+        task = load_task_cached(args.input)
+    if args.representation == "fdr":
+        return search_fdr(args, task)
+    if not args.no_simplify:
+        task, simplify_report = simplify_task(task)
+        print(simplify_report.report())
+    if args.search == "hdastar":
+        return search_hdastar(args, task)
+    
+    # Define the heuristic function based on user input
+    heuristic = make_heuristic(args.heuristic, task)
+    batch_heuristic = None
+    if args.batch:
+        from hmax_numpy import BatchHmax
+        batch_heuristic = BatchHmax(task).evaluate_states
+    pool = None
+    if args.workers > 1:
+        from parallel_eval import ParallelEvaluator
+        pool = batch_heuristic = ParallelEvaluator(task, args.heuristic, args.workers,
+                                                   sample_interval=args.speedup_sample)
+    cache = None
+    if args.cache_size > 0:
+        cache = heuristic = HeuristicCache(heuristic, args.cache_size, args.cache_bytes,
+                                           batch_fn=batch_heuristic)
+        if batch_heuristic is not None:
+            batch_heuristic = cache.batch
+    
+    successor_generator = SUCCESSOR_GENERATORS[args.successor_generator](task)
+    print(successor_generator.report())
+    pruning = None
+    if args.pruning == "stubborn":
+        pruning = successor_generator = StubbornSetSuccessorGenerator(task, successor_generator)
     
     # Run A* search
-    plan, cost = astar(init_atoms, goal_atoms, strips_ops, heuristic)
+    statistics = SearchStatistics(detailed=args.stats)
+    table = None
+    anytime = None
+    incremental = None
+    if args.anytime:
+        from anytime import AnytimeSearch
+        
+        def print_plan(plan, cost):
+            print(f"Found plan with cost {cost}:")
+            for op_name in plan:
+                print(op_name)
+            sys.stdout.flush()
+        
+        anytime = AnytimeSearch(task, heuristic, successor_generator, weights, args.time_limit,
+                                print_plan, statistics)
+        search_args = (anytime.run,)
+    elif args.search == "idastar":
+        from idastar import idastar, TranspositionTable
+        if args.tt_size > 0:
+            table = TranspositionTable(args.tt_size)
+        search_args = (idastar, task, heuristic, successor_generator, table, statistics)
+    elif args.lazy:
+        ordering = make_heuristic(args.ordering, task) if args.ordering else None
+        search_args = (lazy_astar, task, heuristic, successor_generator, ordering, statistics,
+                       OPEN_LISTS[args.open_list]())
+    else:
+        if args.incremental:
+            incremental = make_incremental_heuristic(args.heuristic, task)
+        search_args = (astar, task, heuristic, successor_generator, batch_heuristic, statistics,
+                       OPEN_LISTS[args.open_list](), incremental, args.incremental_limit)
+    try:
+        if args.profile:
+            plan, cost = profile_call(args.profile, *search_args)
+        else:
+            search, *search_args = search_args
+            plan, cost = search(*search_args)
+    finally:
+        if pool is not None:
+            pool.close()
     
+    print(statistics.report())
+    if pool is not None:
+        print(pool.report())
+    if cache is not None:
+        print(cache.report())
+    if table is not None:
+        print(table.report())
+    if pruning is not None:
+        print(pruning.report())
+    if anytime is not None:
+        print(anytime.report())
+    if incremental is not None:
+        print(incremental.report())
     if plan is None:
         print("No plan found")
     else:
@@ -2,73 +2,129 @@ import sys
 import argparse
 
 
-def parse_sas(filename):
+class SASStream:
+    """
+    A SAS task whose header has been parsed and whose operators are read
+    lazily from the file.
+
+    `operators` is a generator yielding operator dicts (name, prevails,
+    effects, cost) in file order; the file is closed once it is exhausted
+    or closed. `mutex_groups` lists the (var_idx, val_idx) facts of every
+    mutex group; at most one fact of a group is true in a reachable state.
+    """
+    __slots__ = ('variables', 'var_domains', 'initial_state', 'goal_state', 'operators',
+                 'mutex_groups')
+
+    def __init__(self, variables, var_domains, initial_state, goal_state, operators,
+                 mutex_groups=()):
+        self.variables = variables
+        self.var_domains = var_domains
+        self.initial_state = initial_state
+        self.goal_state = goal_state
+        self.operators = operators
+        self.mutex_groups = list(mutex_groups)
+
+
+def _lines(f):
+    # Stripped non-empty lines, read incrementally
+    for line in f:
+        line = line.strip()
+        if line:
+            yield line
+
+
+def _skip_section(lines, end_marker):
+    for line in lines:
+        if line == end_marker:
+            return
+
+
+def stream_sas(filename):
+    """
+    Parse a SAS file in a single streaming pass.
+
+    The variables, mutex groups, initial state and goal are parsed eagerly;
+    the operators, which follow the goal in the file, are yielded by the
+    returned SASStream's `operators` generator without ever holding the
+    whole text.
+    """
     variables = []
     var_domains = []
     initial_state = []
     goal_state = []
-    operators = []
-
-    with open(filename) as f:
-        lines = [line.strip() for line in f if line.strip()]
-
-    idx = 0
-    # First, collect variable definitions
-    while idx < len(lines):
-        if lines[idx] == 'begin_variable':
-            var_name = lines[idx + 1]
-            domain_size = int(lines[idx + 3])
-            domain = lines[idx + 4 : idx + 4 + domain_size]
-            variables.append(var_name)
-            var_domains.append(domain)
-            idx = idx + 4 + domain_size + 1  # skip past end_variable
-        elif lines[idx] == 'begin_state':
-            idx += 1
-            for _ in range(len(variables)):
-                initial_state.append(int(lines[idx])); idx += 1
-        elif lines[idx] == 'begin_goal':
-            idx += 1
-            goal_count = int(lines[idx]); idx += 1
-            for _ in range(goal_count):
-                var_idx, val_idx = map(int, lines[idx].split())
-                goal_state.append((var_idx, val_idx))
-                idx += 1
-        elif lines[idx] == 'begin_operator':
-            idx += 1
-            op = { 'prevails': [], 'effects': [] }
-            op['name'] = lines[idx]; idx += 1
-            prev_n = int(lines[idx]); idx += 1
-            for _ in range(prev_n):
-                var_idx, val_idx = map(int, lines[idx].split())
-                op['prevails'].append((var_idx, val_idx)); idx += 1
-            eff_n = int(lines[idx]); idx += 1
-            for _ in range(eff_n):
-                parts = list(map(int, lines[idx].split()))
-                # SAS effect: [flag, var_idx, old_val, new_val]
-                _, var_idx, old_val, new_val = parts
-                op['effects'].append((var_idx, old_val, new_val))
-                idx += 1
-            op['cost'] = int(lines[idx]); idx += 1
-            assert lines[idx] == 'end_operator'
-            idx += 1
-            operators.append(op)
-        else:
-            idx += 1
-
-    return variables, var_domains, initial_state, goal_state, operators
+    mutex_groups = []
 
+    f = open(filename)
+    lines = _lines(f)
+    try:
+        for line in lines:
+            if line == 'begin_variable':
+                variables.append(next(lines))
+                next(lines)  # axiom layer
+                domain_size = int(next(lines))
+                var_domains.append([next(lines) for _ in range(domain_size)])
+                next(lines)  # end_variable
+            elif line == 'begin_mutex_group':
+                group = []
+                for _ in range(int(next(lines))):
+                    var_idx, val_idx = map(int, next(lines).split())
+                    group.append((var_idx, val_idx))
+                mutex_groups.append(group)
+                next(lines)  # end_mutex_group
+            elif line == 'begin_state':
+                for _ in range(len(variables)):
+                    initial_state.append(int(next(lines)))
+            elif line == 'begin_goal':
+                for _ in range(int(next(lines))):
+                    var_idx, val_idx = map(int, next(lines).split())
+                    goal_state.append((var_idx, val_idx))
+                break  # Only operators and axioms follow
+    except BaseException:
+        f.close()
+        raise
 
-def to_strips(var_domains, initial_state, goal_state, operators):
+    return SASStream(variables, var_domains, initial_state, goal_state,
+                     _stream_operators(f, lines), mutex_groups)
+
+
+def _stream_operators(f, lines):
+    with f:
+        for line in lines:
+            if line == 'begin_operator':
+                op = { 'prevails': [], 'effects': [] }
+                op['name'] = next(lines)
+                for _ in range(int(next(lines))):
+                    var_idx, val_idx = map(int, next(lines).split())
+                    op['prevails'].append((var_idx, val_idx))
+                for _ in range(int(next(lines))):
+                    # SAS effect: [flag, var_idx, old_val, new_val]
+                    _, var_idx, old_val, new_val = map(int, next(lines).split())
+                    op['effects'].append((var_idx, old_val, new_val))
+                op['cost'] = int(next(lines))
+                assert next(lines) == 'end_operator'
+                yield op
+            elif line == 'begin_rule':
+                _skip_section(lines, 'end_rule')
+
+
+def parse_sas(filename):
+    sas = stream_sas(filename)
+    operators = list(sas.operators)
+    return sas.variables, sas.var_domains, sas.initial_state, sas.goal_state, operators
+
+
+def strip_atom(atom):
     # Helper to strip 'Atom ' or 'NegatedAtom '
-    def strip_atom(atom):
-        return atom.replace('Atom ', '').replace('NegatedAtom ', '').strip()
+    return atom.replace('Atom ', '').replace('NegatedAtom ', '').strip()
 
-    # Build atom mapping
-    atom_map = {}
-    for i, domain in enumerate(var_domains):
-        for j, atom in enumerate(domain):
-            atom_map[(i, j)] = strip_atom(atom)
 
+def to_strips(var_domains, initial_state, goal_state, operators):
+    init_atoms, goal_atoms = strips_init_goal(var_domains, initial_state, goal_state)
+    strips_ops = list(iter_strips_ops(var_domains, operators))
+    return init_atoms, goal_atoms, strips_ops
+
+
+def strips_init_goal(var_domains, initial_state, goal_state):
     # Build initial facts
     init_atoms = []
     for i, val in enumerate(initial_state):
@@ -78,9 +134,18 @@ def to_strips(var_domains, initial_state, goal_state, operators):
 
     # Build goal facts
     goal_atoms = [ strip_atom(var_domains[i][j]) for (i, j) in goal_state ]
+    return init_atoms, goal_atoms
+
+
+def iter_strips_ops(var_domains, operators):
+    """Convert SAS operators to STRIPS operator dicts one at a time."""
+    # Build atom mapping
+    atom_map = {}
+    for i, domain in enumerate(var_domains):
+        for j, atom in enumerate(domain):
+            atom_map[(i, j)] = strip_atom(atom)
 
     # Convert operators
-    strips_ops = []
     for op in operators:
         preconds = []
         # prevail conditions
@@ -96,15 +161,151 @@ def to_strips(var_domains, initial_state, goal_state, operators):
                 adds.append(atom_map[(var, new)])
             if old >= 0:
                 dels.append(atom_map[(var, old)])
-        strips_ops.append({
+        yield {
             'name': op['name'],
             'pre': sorted(set(preconds)),
             'add': sorted(set(adds)),
             'del': sorted(set(dels)),
             'cost': op['cost']
-        })
+        }
 
-    return init_atoms, goal_atoms, strips_ops
+
+def pack_atoms(atom_ids):
+    """Pack atom IDs into an int bitmask with bit i set iff atom i is true."""
+    mask = 0
+    for atom in atom_ids:
+        mask |= 1 << atom
+    return mask
+
+
+def unpack_atoms(mask):
+    """Return the sorted list of atom IDs set in a bitmask."""
+    atoms = []
+    while mask:
+        low = mask & -mask
+        atoms.append(low.bit_length() - 1)
+        mask ^= low
+    return atoms
+
+
+class Operator:
+    """
+    A STRIPS operator whose pre/add/del lists are tuples of atom IDs.
+
+    The *_mask attributes hold the same lists as bitmasks over atom IDs
+    for use with packed states (see Task.pack).
+    """
+    __slots__ = ('index', 'name', 'pre', 'add', 'delete', 'cost',
+                 'pre_mask', 'add_mask', 'keep_mask')
+
+    def __init__(self, index, name, pre, add, delete, cost):
+        self.index = index
+        self.name = name
+        self.pre = pre
+        self.add = add
+        self.delete = delete
+        self.cost = cost
+        self.pre_mask = pack_atoms(pre)
+        self.add_mask = pack_atoms(add)
+        self.keep_mask = ~pack_atoms(delete)
+
+    def __repr__(self):
+        return f"Operator({self.index}, {self.name!r})"
+
+
+class Task:
+    """
+    Compiled STRIPS task with every atom interned to a dense integer ID.
+
+    Atom names are only kept to print plans and debug output; the planner
+    and the heuristics work on the integer IDs exclusively. The search packs
+    states into a single int with bit i set iff atom i is true, which makes
+    them compact, immutable and cheap to hash.
+
+    Attributes:
+        atoms: List of atom names, indexed by atom ID
+        atom_ids: Dict mapping atom name -> atom ID
+        init: Tuple of atom IDs true in the initial state
+        goal: Tuple of atom IDs that must be true in the goal
+        operators: List of Operator records, indexed by operator ID
+        var_atoms: For every SAS variable, the tuple of atom IDs of its values
+        precondition_of: For every atom, the IDs of operators requiring it
+        num_pre: Number of preconditions of every operator
+    """
+    __slots__ = ('atoms', 'atom_ids', 'init', 'goal', 'operators', 'var_atoms',
+                 'precondition_of', 'num_pre', 'goal_mask')
+
+    def __init__(self, atoms, init, goal, operators, var_atoms):
+        self.atoms = atoms
+        self.atom_ids = {name: i for i, name in enumerate(atoms)}
+        self.init = init
+        self.goal = goal
+        self.operators = operators
+        self.var_atoms = var_atoms
+        self.goal_mask = pack_atoms(goal)
+
+        # Fact -> operator adjacency index used by the relaxed explorations
+        precondition_of = [[] for _ in atoms]
+        for op in operators:
+            for atom in op.pre:
+                precondition_of[atom].append(op.index)
+        self.precondition_of = tuple(tuple(ops) for ops in precondition_of)
+        self.num_pre = [len(op.pre) for op in operators]
+
+    @property
+    def num_atoms(self):
+        return len(self.atoms)
+
+    def atom_names(self, atom_ids):
+        return [self.atoms[a] for a in atom_ids]
+
+    def initial_state(self):
+        """The initial state in packed form."""
+        return pack_atoms(self.init)
+
+
+def compile_task(var_domains, initial_state, goal_state, operators):
+    """
+    Convert a parsed SAS task into a compiled Task.
+
+    The STRIPS semantics are exactly those of to_strips(); only the
+    representation changes. `operators` may be a generator, it is consumed
+    lazily.
+    """
+    init_atoms, goal_atoms = strips_init_goal(var_domains, initial_state, goal_state)
+
+    # Intern atoms in variable order so that the IDs are dense
+    atoms = []
+    atom_ids = {}
+
+    def intern(name):
+        atom = atom_ids.get(name)
+        if atom is None:
+            atom = atom_ids[name] = len(atoms)
+            atoms.append(name)
+        return atom
+
+    var_atoms = [tuple(intern(strip_atom(value)) for value in domain)
+                 for domain in var_domains]
+
+    ops = []
+    for i, op in enumerate(iter_strips_ops(var_domains, operators)):
+        ops.append(Operator(i, op['name'],
+                            tuple(intern(a) for a in op['pre']),
+                            tuple(intern(a) for a in op['add']),
+                            tuple(intern(a) for a in op['del']),
+                            op['cost']))
+
+    init = tuple(sorted(set(intern(a) for a in init_atoms)))
+    goal = tuple(sorted(set(intern(a) for a in goal_atoms)))
+    return Task(atoms, init, goal, ops, var_atoms)
+
+
+def load_task(filename):
+    """Parse a SAS file and compile it into a Task."""
+    sas = stream_sas(filename)
+    return compile_task(sas.var_domains, sas.initial_state, sas.goal_state,
+                        sas.operators)
 
 
 def main():
@@ -0,0 +1,101 @@
+"""
+Search statistics and instrumentation.
+
+SearchStatistics always collects a few cheap counters. When created with
+detailed=True, the search also accounts wall time per phase, samples the
+open list size, and records (and prints) a progress line every time
+the f value of the expanded nodes increases. Without detailed=True none
+of the timing code runs.
+"""
+
+import sys
+import time
+import cProfile
+
+PHASES = ('open_list', 'successors', 'apply', 'heuristic')
+
+class SearchStatistics:
+    """Counters filled in by a search run."""
+
+    def __init__(self, detailed=False, sample_interval=100, out=None):
+        self.expanded = 0    # nodes expanded
+        self.generated = 0   # successor states generated
+        self.evaluated = 0   # heuristic evaluations requested
+        self.reopened = 0    # expanded nodes reached again by a cheaper path
+        self.dead_ends = 0   # states with an infinite heuristic value
+        self.reinserted = 0  # lazily evaluated nodes queued again with a higher f
+        self.cheap_evaluated = 0  # ordering heuristic evaluations (lazy search)
+        self.iterations = 0  # depth-first iterations (IDA*)
+        self.pruned = 0      # successors violating a mutex group (FDR search)
+
+        self.detailed = detailed
+        self.sample_interval = sample_interval
+        self.out = out if out is not None else sys.stdout
+        self.phase_times = dict.fromkeys(PHASES, 0.0)
+        self.open_list_sizes = []  # (expanded, open list size) samples
+        self.f_layers = []         # (f, expanded, generated, seconds) per new f value
+        self.start_time = time.perf_counter()
+
+    def new_f_layer(self, f):
+        """Record (and print) that the first node with value `f` is expanded."""
+        elapsed = time.perf_counter() - self.start_time
+        self.f_layers.append((f, self.expanded, self.generated, elapsed))
+        print(f"f = {f} [{self.expanded} expanded, {self.generated} generated, "
+              f"{elapsed:.3f}s]", file=self.out)
+
+    def sample_open_list(self, size):
+        self.open_list_sizes.append((self.expanded, size))
+
+    def as_dict(self):
+        result = {
+            'expanded': self.expanded,
+            'generated': self.generated,
+            'evaluated': self.evaluated,
+            'reopened': self.reopened,
+            'dead_ends': self.dead_ends,
+            'reinserted': self.reinserted,
+            'cheap_evaluated': self.cheap_evaluated,
+            'iterations': self.iterations,
+            'pruned': self.pruned,
+        }
+        if self.detailed:
+            result['phase_times'] = dict(self.phase_times)
+            result['open_list_sizes'] = list(self.open_list_sizes)
+            result['f_layers'] = list(self.f_layers)
+        return result
+
+    def report(self):
+        lines = [f"Expanded {self.expanded} state(s), generated {self.generated} state(s), "
+                 f"evaluated {self.evaluated} state(s)",
+                 f"Reopened {self.reopened} state(s), {self.dead_ends} dead end(s)"]
+        if self.reinserted or self.cheap_evaluated:
+            lines.append(f"Reinserted {self.reinserted} state(s), "
+                         f"{self.cheap_evaluated} ordering evaluation(s)")
+        if self.iterations:
+            lines.append(f"IDA* iteration(s): {self.iterations}")
+        if self.pruned:
+            lines.append(f"Pruned {self.pruned} successor(s) violating a mutex group")
+        if self.detailed:
+            total = time.perf_counter() - self.start_time
+            for phase in PHASES:
+                seconds = self.phase_times[phase]
+                share = seconds / total if total else 0.0
+                lines.append(f"Time in {phase}: {seconds:.3f}s ({share:.1%})")
+            lines.append(f"Search time: {total:.3f}s")
+            if self.open_list_sizes:
+                peak = max(size for _, size in self.open_list_sizes)
+                lines.append(f"Open list: peak sampled size {peak}, "
+                             f"{len(self.open_list_sizes)} sample(s)")
+        return '\n'.join(lines)
+
+def profile_call(path, fn, *args, **kwargs):
+    """
+    Run fn(*args, **kwargs) under cProfile and dump the profile to `path`.
+
+    The dump can be inspected with `python -m pstats <path>` or snakeviz.
+    """
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(fn, *args, **kwargs)
+    finally:
+        profiler.dump_stats(path)
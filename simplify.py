@@ -0,0 +1,151 @@
+"""
+Task simplification before search.
+
+simplify_task removes the parts of a compiled Task the search can never
+use, in three steps:
+
+    reachability  relaxed forward exploration from the initial state;
+                  operators with an unreachable precondition never apply
+    relevance     backward from the goal, an atom is relevant if it is a
+                  goal or a precondition of a relevant operator, and an
+                  operator is relevant if it adds a relevant atom; an
+                  operator that only adds irrelevant atoms can be dropped
+                  from any plan, which stays valid and gets cheaper
+    duplicates    of several operators with the same pre/add/del lists
+                  (after the irrelevant atoms are dropped), only the
+                  cheapest is kept
+
+Remaining atoms and operators are renumbered densely, so every per-atom
+and per-operator loop in the heuristics and the successor generator runs
+over the smaller task. Operator names are kept, and the optimal plan
+cost does not change. Goal atoms are always kept; if one is unreachable,
+the heuristics report the task as unsolvable as before.
+"""
+
+import time
+from sas_parser import Operator, Task
+
+class SimplifyReport:
+    """What simplify_task removed."""
+
+    def __init__(self, task):
+        self.atoms_before = task.num_atoms
+        self.operators_before = len(task.operators)
+        self.atoms_after = self.atoms_before
+        self.operators_after = self.operators_before
+        self.unreachable_operators = 0
+        self.irrelevant_operators = 0
+        self.duplicate_operators = 0
+        self.time = 0.0
+
+    def report(self):
+        return (f"Simplified task: {self.atoms_after}/{self.atoms_before} atoms, "
+                f"{self.operators_after}/{self.operators_before} operators kept "
+                f"({self.unreachable_operators} unreachable, "
+                f"{self.irrelevant_operators} irrelevant, "
+                f"{self.duplicate_operators} duplicate) in {self.time:.3f}s")
+
+def reachable_atoms(task):
+    """
+    Return the atoms reachable from the initial state in the delete
+    relaxation, as a list of bools indexed by atom ID.
+    """
+    operators = task.operators
+    precondition_of = task.precondition_of
+    unsatisfied = task.num_pre.copy()
+    reached = [False] * task.num_atoms
+    queue = []
+
+    def reach(atoms):
+        for atom in atoms:
+            if not reached[atom]:
+                reached[atom] = True
+                queue.append(atom)
+
+    reach(task.init)
+    for op in operators:
+        if not op.pre:
+            reach(op.add)
+    while queue:
+        atom = queue.pop()
+        for op_id in precondition_of[atom]:
+            unsatisfied[op_id] -= 1
+            if not unsatisfied[op_id]:
+                reach(operators[op_id].add)
+    return reached
+
+def relevant_atoms(task, operators):
+    """
+    Return the atoms relevant for the goal, as a list of bools indexed by
+    atom ID, considering only `operators`.
+    """
+    achievers = [[] for _ in range(task.num_atoms)]
+    for op in operators:
+        for atom in op.add:
+            achievers[atom].append(op)
+    relevant = [False] * task.num_atoms
+    used = set()
+    stack = list(task.goal)
+    while stack:
+        atom = stack.pop()
+        if relevant[atom]:
+            continue
+        relevant[atom] = True
+        for op in achievers[atom]:
+            if op.index not in used:
+                used.add(op.index)
+                stack.extend(op.pre)
+    return relevant
+
+def simplify_task(task):
+    """
+    Remove unreachable and irrelevant atoms and operators and duplicate
+    operators from a compiled Task.
+
+    Returns:
+        (simplified Task, SimplifyReport)
+    """
+    start = time.perf_counter()
+    report = SimplifyReport(task)
+
+    reached = reachable_atoms(task)
+    reachable_ops = [op for op in task.operators if all(reached[atom] for atom in op.pre)]
+    report.unreachable_operators = len(task.operators) - len(reachable_ops)
+
+    relevant = relevant_atoms(task, reachable_ops)
+    for atom in task.goal:
+        relevant[atom] = True
+    relevant_ops = [op for op in reachable_ops if any(relevant[atom] for atom in op.add)]
+    report.irrelevant_operators = len(reachable_ops) - len(relevant_ops)
+
+    # Renumber the kept atoms densely, in their old order
+    new_id = [-1] * task.num_atoms
+    atoms = []
+    for atom, name in enumerate(task.atoms):
+        if relevant[atom]:
+            new_id[atom] = len(atoms)
+            atoms.append(name)
+
+    def remap(atom_ids):
+        return tuple(new_id[atom] for atom in atom_ids if new_id[atom] >= 0)
+
+    # Keep the cheapest of every group of identical operators, in file order
+    cheapest = {}
+    for op in relevant_ops:
+        key = (remap(op.pre), remap(op.add), remap(op.delete))
+        best = cheapest.get(key)
+        if best is None or op.cost < best[0].cost:
+            cheapest[key] = (op, key)
+    kept = sorted(cheapest.values(), key=lambda entry: entry[0].index)
+    report.duplicate_operators = len(relevant_ops) - len(kept)
+
+    operators = [Operator(i, op.name, pre, add, delete, op.cost)
+                 for i, (op, (pre, add, delete)) in enumerate(kept)]
+    var_atoms = [remap(group) for group in task.var_atoms]
+    simplified = Task(atoms, remap(task.init), remap(task.goal), operators,
+                      [group for group in var_atoms if group])
+
+    report.atoms_after = simplified.num_atoms
+    report.operators_after = len(operators)
+    report.time = time.perf_counter() - start
+    return simplified, report
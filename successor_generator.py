@@ -0,0 +1,139 @@
+"""
+Successor generators returning the operators applicable in a state.
+
+SuccessorGenerator is a decision tree over the SAS variables, in the
+spirit of Fast Downward's successor generator. Every inner node switches
+on the value of one variable; operators without a precondition on that
+variable go to a "don't care" child. Looking up a state only visits the
+branches consistent with it, so the cost of a lookup depends on the
+number of applicable operators rather than on the size of the task.
+"""
+
+import sys
+import time
+from operator import attrgetter
+
+class _Node:
+    __slots__ = ('switch', 'dont_care', 'ops')
+
+    def __init__(self, switch, dont_care, ops):
+        self.switch = switch        # list of (atom bit, child node)
+        self.dont_care = dont_care  # child node or None
+        self.ops = ops              # operators applicable at this node
+
+class SuccessorGenerator:
+    """
+    Decision-tree successor generator built once per task.
+
+    Attributes:
+        num_nodes: Number of tree nodes
+        build_time: Seconds spent building the tree
+        memory: Approximate size of the tree in bytes
+    """
+
+    def __init__(self, task):
+        start = time.perf_counter()
+        # Order the preconditions of every operator by SAS variable
+        atom_var = {}
+        for var, atoms in enumerate(task.var_atoms):
+            for atom in atoms:
+                atom_var.setdefault(atom, var)
+        entries = []
+        for op in task.operators:
+            conditions = sorted((atom_var.get(atom, -1), atom) for atom in op.pre)
+            entries.append((op, conditions))
+
+        self.num_nodes = 0
+        self.memory = 0
+        self.root = self._build(entries)
+        self.build_time = time.perf_counter() - start
+
+    def _build(self, entries):
+        """
+        Build the subtree for a list of (operator, conditions) entries, where
+        conditions are the (variable, atom) pairs not tested yet.
+        """
+        if not entries:
+            return None
+
+        ops = [op for op, conditions in entries if not conditions]
+        pending = [entry for entry in entries if entry[1]]
+        switch = []
+        dont_care = None
+        if pending:
+            # Switch on the lowest variable any pending operator tests
+            var = min(conditions[0][0] for op, conditions in pending)
+            by_atom = {}
+            rest = []
+            for op, conditions in pending:
+                if conditions[0][0] == var:
+                    by_atom.setdefault(conditions[0][1], []).append(
+                        (op, conditions[1:]))
+                else:
+                    rest.append((op, conditions))
+            switch = [(1 << atom, self._build(children))
+                      for atom, children in sorted(by_atom.items())]
+            dont_care = self._build(rest)
+
+        node = _Node(switch, dont_care, ops)
+        self.num_nodes += 1
+        self.memory += (sys.getsizeof(node) + sys.getsizeof(switch)
+                        + sys.getsizeof(ops))
+        return node
+
+    def get_applicable(self, state):
+        """
+        Return the operators applicable in a state, ordered by operator ID.
+
+        Args:
+            state: Packed state (int bitmask over atom IDs)
+        """
+        applicable = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            if node.ops:
+                applicable.extend(node.ops)
+            for bit, child in node.switch:
+                if state & bit:
+                    stack.append(child)
+            if node.dont_care is not None:
+                stack.append(node.dont_care)
+        applicable.sort(key=attrgetter('index'))
+        return applicable
+
+    def report(self):
+        return (f"Successor generator: {self.num_nodes} nodes, "
+                f"{self.memory / 1024:.1f} KiB, built in {self.build_time:.3f}s")
+
+class LinearSuccessorGenerator:
+    """Check the preconditions of every operator in every state."""
+
+    def __init__(self, task):
+        start = time.perf_counter()
+        self.operators = task.operators
+        self.num_nodes = 0
+        self.memory = 0
+        self.build_time = time.perf_counter() - start
+
+    def get_applicable(self, state):
+        """
+        Return operators applicable in the current state.
+
+        Args:
+            state: Packed state (int bitmask over atom IDs)
+        """
+        applicable = []
+        for op in self.operators:
+            # An operator is applicable if all preconditions are satisfied
+            if state & op.pre_mask == op.pre_mask:
+                applicable.append(op)
+        return applicable
+
+    def report(self):
+        return "Successor generator: linear scan over all operators"
+
+SUCCESSOR_GENERATORS = {
+    'tree': SuccessorGenerator,
+    'linear': LinearSuccessorGenerator,
+}
@@ -0,0 +1,195 @@
+"""
+On-disk cache of compiled tasks.
+
+The first time a .sas file is loaded, the compiled Task (interned atoms,
+operators, initial state, goal and variable groups) is written to a
+binary file next to it (`<task>.sas.taskc`). Later loads memory-map that
+file and decode the Task from memoryview casts of its integer sections
+(building the operator tuples and names from them) instead of parsing and
+compiling the SAS text again.
+
+The header carries COMPILE_VERSION, the version of the STRIPS compilation
+that produced the cached task. Bump it whenever sas_parser compiles a SAS
+file differently, so that caches written by older code are rebuilt.
+
+The cache records the size, mtime and SHA-1 digest of the source file.
+It is used when size and mtime match, or when the digest matches (the
+file was only touched, and the recorded size and mtime are refreshed);
+otherwise it is rebuilt.
+
+File layout (native byte order, all integers 32 bit unless noted):
+    header      MAGIC, byte order mark (H), COMPILE_VERSION (H),
+                source size (q), mtime_ns (q),
+                SHA-1 digest (20s), 13 section lengths (I)
+    sections    var_offsets, var_atoms, init, goal, costs,
+                pre_offsets, pre, add_offsets, add, del_offsets, del,
+                name_offsets (atoms then operators), names (UTF-8 bytes)
+"""
+
+import os
+import sys
+import mmap
+import struct
+import hashlib
+from array import array
+from sas_parser import Operator, Task, load_task
+
+MAGIC = b'SASTASK1'
+# Version of the compiled-task semantics; bump on any change to compilation
+COMPILE_VERSION = 1
+SUFFIX = '.taskc'
+BYTE_ORDER_MARK = 0x0102
+HEADER = struct.Struct('=8sHH4xqq20s13I')  # 104 bytes, keeps the sections aligned
+
+def cache_path(sasfile):
+    return sasfile + SUFFIX
+
+def _digest(filename):
+    h = hashlib.sha1()
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.digest()
+
+def _flatten(groups):
+    offsets = array('i', [0])
+    flat = array('i')
+    for group in groups:
+        flat.extend(group)
+        offsets.append(len(flat))
+    return offsets, flat
+
+def write_task_cache(task, sasfile, digest=None):
+    """Write the compiled task for `sasfile` to its cache file."""
+    st = os.stat(sasfile)
+    if digest is None:
+        digest = _digest(sasfile)
+
+    ops = task.operators
+    var_offsets, var_flat = _flatten(task.var_atoms)
+    pre_offsets, pre_flat = _flatten(op.pre for op in ops)
+    add_offsets, add_flat = _flatten(op.add for op in ops)
+    del_offsets, del_flat = _flatten(op.delete for op in ops)
+    encoded = [name.encode('utf-8') for name in task.atoms]
+    encoded.extend(op.name.encode('utf-8') for op in ops)
+    name_offsets = array('i', [0])
+    for name in encoded:
+        name_offsets.append(name_offsets[-1] + len(name))
+    names = b''.join(encoded)
+
+    int_sections = [var_offsets, var_flat, array('i', task.init), array('i', task.goal),
+                    array('i', [op.cost for op in ops]),
+                    pre_offsets, pre_flat, add_offsets, add_flat, del_offsets, del_flat,
+                    name_offsets]
+    lengths = [len(section) for section in int_sections] + [len(names)]
+    header = HEADER.pack(MAGIC, BYTE_ORDER_MARK, COMPILE_VERSION, st.st_size, st.st_mtime_ns, digest, *lengths)
+
+    # Write to a temporary file first so readers never see a partial cache
+    path = cache_path(sasfile)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(header)
+            for section in int_sections:
+                f.write(section.tobytes())
+            f.write(names)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+def read_task_cache(sasfile):
+    """
+    Load the cached task for `sasfile`.
+
+    Returns:
+        The Task, or None if there is no valid cache for the current file
+    """
+    path = cache_path(sasfile)
+    try:
+        st = os.stat(sasfile)
+        f = open(path, 'rb')
+    except OSError:
+        return None
+    with f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return None  # Empty file
+        with mm:
+            if mm.size() < HEADER.size:
+                return None
+            magic, bom, version, size, mtime_ns, digest, *lengths = HEADER.unpack_from(mm)
+            if magic != MAGIC or bom != BYTE_ORDER_MARK or version != COMPILE_VERSION:
+                return None
+            stale_stat = (size, mtime_ns) != (st.st_size, st.st_mtime_ns)
+            if stale_stat and digest != _digest(sasfile):
+                return None
+            task = _decode(mm, lengths)
+    if stale_stat:
+        # The file was only touched; record its new size and mtime so that
+        # later loads take the stat-only path instead of hashing it again
+        try:
+            write_task_cache(task, sasfile, digest)
+        except OSError as e:
+            print(f"Warning: could not refresh task cache: {e}", file=sys.stderr)
+    return task
+
+def _decode(mm, lengths):
+    view = memoryview(mm)
+    try:
+        ints = view[HEADER.size:HEADER.size + 4 * sum(lengths[:-1])].cast('i')
+        sections = []
+        pos = 0
+        for length in lengths[:-1]:
+            sections.append(ints[pos:pos + length])
+            pos += length
+        (var_offsets, var_flat, init, goal, costs, pre_offsets, pre_flat,
+         add_offsets, add_flat, del_offsets, del_flat, name_offsets) = sections
+        start = HEADER.size + 4 * pos
+        names = view[start:start + lengths[-1]]
+
+        def group(offsets, flat, i):
+            return tuple(flat[offsets[i]:offsets[i + 1]])
+
+        def name(i):
+            return str(names[name_offsets[i]:name_offsets[i + 1]], 'utf-8')
+
+        num_atoms = len(name_offsets) - 1 - len(costs)
+        atoms = [name(i) for i in range(num_atoms)]
+        var_atoms = [group(var_offsets, var_flat, i) for i in range(len(var_offsets) - 1)]
+        operators = [Operator(i, name(num_atoms + i),
+                              group(pre_offsets, pre_flat, i),
+                              group(add_offsets, add_flat, i),
+                              group(del_offsets, del_flat, i),
+                              costs[i])
+                     for i in range(len(costs))]
+        task = Task(atoms, tuple(init), tuple(goal), operators, var_atoms)
+        # Release the views on the map before it is closed
+        for section in sections:
+            section.release()
+        names.release()
+        ints.release()
+        return task
+    finally:
+        view.release()
+
+def load_task_cached(sasfile):
+    """
+    Load a compiled task, using and refreshing the on-disk cache.
+
+    If the cache cannot be written (e.g. a read-only directory), the task
+    is still returned.
+    """
+    task = read_task_cache(sasfile)
+    if task is not None:
+        return task
+    task = load_task(sasfile)
+    try:
+        write_task_cache(task, sasfile)
+    except OSError as e:
+        print(f"Warning: could not write task cache: {e}", file=sys.stderr)
+    return task